@@ -1 +1,8 @@
 # This file marks the app directory as a Python package.
+import os
+from dotenv import load_dotenv
+
+# Load settings before any submodule reads them with os.getenv at import time: app/.env first (as the
+# README describes), then any .env found from the working directory. Real environment variables win.
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+load_dotenv()
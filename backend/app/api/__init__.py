@@ -1,23 +1,85 @@
+import os
+from typing import Optional, Tuple
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from .outlet import router as outlet_router
 from .chatbot import router as chatbot_router
+from .health import router as health_router
+from .metrics import router as metrics_router
+from ..migrations import run_migrations
+from ..database import SessionLocal, dispose_async_engine
+from ..metrics import MetricsMiddleware
+from ..services.warmup import warm_up
 
-app = FastAPI(
-    title="McDonald's Outlet Locator API",
-    description="API for finding McDonald's outlets with geospatial capabilities",
-    version="1.0.0"
-)
-
-# Enable CORS for all origins
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Register routers
-app.include_router(outlet_router)
-app.include_router(chatbot_router) 
\ No newline at end of file
+# Preload outlet data and indexes during startup, before the server accepts traffic
+APP_WARMUP = os.getenv("APP_WARMUP", "1").strip().lower() in ("1", "true", "yes", "on")
+
+def startup(warm: bool = APP_WARMUP) -> Tuple[Optional[str], Optional[dict]]:
+    """Migrations, then (optionally) warm-up; returns the migration error (None on success) and
+    warm-up timings in milliseconds.
+
+    Neither blocks startup when the database is unavailable: the app starts, /health reports it as
+    degraded (with the migration error), and requests retry the connection.
+    """
+    # Make sure newer tables exist and derived data is backfilled on older databases; run_migrations
+    # holds a cross-process lock, so workers starting together migrate one at a time
+    migration_error = None
+    try:
+        run_migrations()
+    except Exception as e:
+        migration_error = f"{e.__class__.__name__}: {e}"
+        print(f"⚠️ Migrations failed at startup: {migration_error}")
+    if not warm:
+        return migration_error, None
+    db = SessionLocal()
+    try:
+        return migration_error, warm_up(db)
+    finally:
+        db.close()
+
+def create_app(warm: bool = APP_WARMUP) -> FastAPI:
+    """Build the API. Importing this module connects to nothing: the database engine, caches and
+    LLM client are created in the lifespan startup (or on first use when warm-up is off)."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.migration_error, app.state.warmup = startup(warm)
+        yield
+        await dispose_async_engine()
+
+    app = FastAPI(
+        title="McDonald's Outlet Locator API",
+        description="API for finding McDonald's outlets with geospatial capabilities",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.warmup = None
+    app.state.migration_error = None
+
+    # Enable CORS for all origins
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
+    )
+
+    # Compress other JSON responses; precompressed responses (e.g. GET /outlets) pass through untouched
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    # Outermost, so latency includes compression; see /metrics and METRICS_SERVER_TIMING
+    app.add_middleware(MetricsMiddleware)
+
+    # Register routers
+    app.include_router(outlet_router)
+    app.include_router(chatbot_router)
+    app.include_router(health_router)
+    app.include_router(metrics_router)
+    return app
+
+# `uvicorn app.api:app`, or `uvicorn --factory app.api:create_app`
+app = create_app()
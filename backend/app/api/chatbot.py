@@ -1,17 +1,79 @@
-from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
-from ..services.chatbot_service import chatbot_search
-from ..database import get_db
+import asyncio
+import os
+from typing import Dict, Optional
+import anyio
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import ORJSONResponse
+from ..services.chatbot_service import chatbot_search, normalize_query
+from ..database import SessionLocal
+from ..schemas.outlet import ChatbotResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.post("/chatbot")
-async def chatbot_endpoint(request: Request, db: Session = Depends(get_db)):
+# Worker threads available to chatbot searches (LLM call + DB queries run off the event loop)
+CHATBOT_MAX_CONCURRENCY = int(os.getenv("CHATBOT_MAX_CONCURRENCY", "8"))
+# Distinct queries allowed to wait for a worker before new ones are rejected with 503
+CHATBOT_MAX_PENDING = int(os.getenv("CHATBOT_MAX_PENDING", "64"))
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(CHATBOT_MAX_CONCURRENCY)
+    return _limiter
+
+def run_chatbot_search(query: str, latitude: Optional[float] = None, longitude: Optional[float] = None) -> dict:
+    """Blocking chatbot search with its own session; runs in a worker thread"""
+    db = SessionLocal()
+    try:
+        return chatbot_search(db, query, latitude, longitude)
+    finally:
+        db.close()
+
+def _search_done(key: str, task: asyncio.Task):
+    _inflight.pop(key, None)
+    # Mark the exception as retrieved when every waiter has gone away
+    if not task.cancelled():
+        task.exception()
+
+async def coalesced_chatbot_search(query: str, latitude: Optional[float] = None, longitude: Optional[float] = None) -> dict:
+    """Run one search per distinct in-flight query; identical concurrent queries share its result.
+
+    The search runs in a detached task that every caller awaits through a shield, so a caller that
+    disconnects or times out never cancels the search the others are waiting on.
+    """
+    key = normalize_query(query)
+    if latitude is not None and longitude is not None:
+        key = f"{key}@{latitude:.4f},{longitude:.4f}"
+    pending = _inflight.get(key)
+    if pending is None:
+        if len(_inflight) >= CHATBOT_MAX_PENDING:
+            raise HTTPException(status_code=503, detail="Chatbot is busy, please retry shortly")
+        pending = asyncio.create_task(
+            anyio.to_thread.run_sync(run_chatbot_search, query, latitude, longitude, limiter=_get_limiter())
+        )
+        _inflight[key] = pending
+        pending.add_done_callback(lambda task: _search_done(key, task))
+    return await asyncio.shield(pending)
+
+@router.post("/chatbot", response_model=ChatbotResponse)
+async def chatbot_endpoint(request: Request):
     try:
         data = await request.json()
         query = data.get("query", "")
         if not query:
             raise HTTPException(status_code=400, detail="Query is required")
-        return chatbot_search(db, query)
+        latitude, longitude = data.get("latitude"), data.get("longitude")
+        if latitude is None or longitude is None:
+            latitude = longitude = None
+        else:
+            latitude, longitude = float(latitude), float(longitude)
+        return ORJSONResponse(await coalesced_chatbot_search(query, latitude, longitude))
+    except HTTPException as e:
+        if e.status_code == 503:
+            raise
+        return ORJSONResponse({"outlets": [], "matched_features": [], "source": "error", "error": str(e)})
     except Exception as e:
-        return {"outlets": [], "matched_features": [], "source": "error", "error": str(e)} 
\ No newline at end of file
+        return ORJSONResponse({"outlets": [], "matched_features": [], "source": "error", "error": str(e)})
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from ..database import check_database_connection, get_pool_stats
+
+router = APIRouter()
+
+def _pool_stats():
+    """Pool stats, or None when the engine cannot even be created (e.g. DATABASE_URL unset)"""
+    try:
+        return get_pool_stats()
+    except Exception as e:
+        print(f"Database pool unavailable: {e}")
+        return None
+
+@router.get("/health")
+def health(request: Request):
+    database_ok = check_database_connection()
+    body = {
+        "status": "ok" if database_ok else "degraded",
+        "database": database_ok,
+        "pool": _pool_stats(),
+        # Milliseconds per warm-up step at startup; null when the app started without warm-up
+        "warmup": getattr(request.app.state, "warmup", None),
+        # Why startup migrations failed, if they did (the app still starts; see app.api.startup)
+        "migration_error": getattr(request.app.state, "migration_error", None)
+    }
+    return JSONResponse(body, status_code=200 if database_ok else 503)
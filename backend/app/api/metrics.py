@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..database import get_pool_stats
+from ..metrics import registry
+from ..services.chatbot_service import get_llm_stats
+from ..services.outlet_service import get_outlet_cache_stats
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _cache_stat(name: str):
+    return lambda: {
+        ("outlets",): get_outlet_cache_stats()[name],
+        ("llm_features",): get_llm_stats()[{"hits": "cache_hits", "misses": "cache_misses", "hit_rate": "cache_hit_rate"}[name]]
+    }
+
+registry.callback("cache_hits_total", "Cache lookups answered from memory", _cache_stat("hits"), "counter", ("cache",))
+registry.callback("cache_misses_total", "Cache lookups that had to load or compute", _cache_stat("misses"), "counter", ("cache",))
+registry.callback("cache_hit_ratio", "Share of cache lookups that were hits", _cache_stat("hit_rate"), "gauge", ("cache",))
+registry.callback("outlet_cache_loads_total", "Outlet snapshot (re)loads after a dataset version change",
+                  lambda: get_outlet_cache_stats()["loads"], "counter")
+registry.callback("outlet_cache_records", "Outlets held in the cached snapshot", lambda: get_outlet_cache_stats()["records"])
+registry.callback("llm_fallbacks_total", "Chatbot queries answered by keyword matching after an unusable LLM answer",
+                  lambda: get_llm_stats()["fallbacks"], "counter")
+registry.callback("db_pool_checked_out", "Database connections currently checked out of the pool",
+                  lambda: get_pool_stats().get("checkedout", 0))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,22 +1,157 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from ..services.outlet_service import list_outlets, get_outlet
-from ..database import get_db
-from typing import Optional
+from ..services.outlet_service import (
+    list_outlets, get_outlet, find_nearby_outlets, get_outlet_overlaps, get_outlets_payload, iter_outlet_records,
+    get_outlet_clusters, list_outlet_changes, search_outlets
+)
+from ..services.overlap_service import DEFAULT_OVERLAP_RADIUS_M
+from ..services.cluster_service import MAX_ZOOM
+from ..opening_hours import minute_of_week
+from ..database import get_db, SessionLocal
+from ..schemas.outlet import (
+    OutletChangesResponse, OutletClustersResponse, OutletOverlapsResponse, OutletResponse, RankedOutletResponse
+)
+from .responses import cached_json_response
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+import orjson
 
-router = APIRouter()
+# Endpoints return ORJSONResponse directly: records are already plain dicts, so response_model
+# only documents the shape and FastAPI skips its validate/jsonable_encoder pass
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.get("/outlets")
+DEFAULT_NEARBY_K = 10
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse 'min_lon,min_lat,max_lon,max_lat' into a tuple of floats"""
+    if not bbox:
+        return None
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise HTTPException(status_code=422, detail="bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+def resolve_open_at(open_now: bool, open_at: Optional[datetime]) -> Optional[int]:
+    """Minute of the week to filter open outlets by; naive open_at values are Malaysia local time"""
+    if open_now and open_at is not None:
+        raise HTTPException(status_code=422, detail="open_now and open_at are mutually exclusive")
+    if open_at is not None:
+        return minute_of_week(open_at)
+    return minute_of_week() if open_now else None
+
+OPEN_NOW_DESCRIPTION = "Only outlets open right now (Malaysia time)"
+OPEN_AT_DESCRIPTION = "Only outlets open at this ISO 8601 date-time; without an offset it is Malaysia time"
+
+@router.get("/outlets", response_model=List[OutletResponse])
 def get_outlets(
+    request: Request,
     limit: Optional[int] = Query(None, ge=1, le=1000, description="Limit number of results"),
     offset: Optional[int] = Query(0, ge=0, description="Offset for pagination"),
+    after: Optional[int] = Query(None, ge=0, description="Keyset cursor: return outlets with id greater than this (see X-Next-Cursor)"),
+    bbox: Optional[str] = Query(None, description="Bounding box filter: min_lon,min_lat,max_lon,max_lat"),
+    open_now: bool = Query(False, description=OPEN_NOW_DESCRIPTION),
+    open_at: Optional[datetime] = Query(None, description=OPEN_AT_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    minute = resolve_open_at(open_now, open_at)
+    if limit is None and not offset and after is None and not bbox and minute is None:
+        # The unfiltered listing is what every map load requests: serve it precompressed with an ETag
+        return cached_json_response(request, get_outlets_payload(db))
+    page = list_outlets(db, limit + 1 if limit else None, offset, parse_bbox(bbox), after, minute)
+    headers = {}
+    if limit and len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = str(page[-1]["id"])
+    return ORJSONResponse(page, headers=headers)
+
+def _stream_outlets(after: Optional[int], fmt: str) -> Iterator[bytes]:
+    # The request-scoped session is closed before the body is streamed, so use our own
+    db = SessionLocal()
+    try:
+        if fmt == "ndjson":
+            for record in iter_outlet_records(db, after):
+                yield orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+        else:
+            yield b"["
+            first = True
+            for record in iter_outlet_records(db, after):
+                yield (b"" if first else b",") + orjson.dumps(record)
+                first = False
+            yield b"]"
+    finally:
+        db.close()
+
+@router.get("/outlets/stream")
+def stream_outlets(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$", description="ndjson (one outlet per line) or json (chunked array)"),
+    after: Optional[int] = Query(None, ge=0, description="Only stream outlets with id greater than this"),
+):
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(_stream_outlets(after, format), media_type=media_type)
+
+@router.get("/outlets/nearby", response_model=List[RankedOutletResponse])
+def get_nearby_outlets(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search point"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the search point"),
+    radius: Optional[float] = Query(None, gt=0, le=500000, description="Search radius in metres"),
+    k: Optional[int] = Query(None, ge=1, le=1000, description="Maximum number of nearest outlets"),
+    open_now: bool = Query(False, description=OPEN_NOW_DESCRIPTION),
+    open_at: Optional[datetime] = Query(None, description=OPEN_AT_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    if radius is None and k is None:
+        k = DEFAULT_NEARBY_K
+    return ORJSONResponse(find_nearby_outlets(db, lat, lon, radius, k, resolve_open_at(open_now, open_at)))
+
+@router.get("/outlets/search", response_model=List[RankedOutletResponse])
+def search(
+    features: Optional[List[str]] = Query(None, description="Feature filter; repeat the parameter or separate with commas"),
+    match: str = Query("any", pattern="^(any|all)$", description="any: outlet has at least one feature; all: every feature"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude to rank results by distance from"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude to rank results by distance from"),
+    radius: Optional[float] = Query(None, gt=0, le=500000, description="Only return outlets within this many metres"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of results (top-k)"),
+    open_now: bool = Query(False, description=OPEN_NOW_DESCRIPTION),
+    open_at: Optional[datetime] = Query(None, description=OPEN_AT_DESCRIPTION),
+    db: Session = Depends(get_db)
+):
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=422, detail="lat and lon must be given together")
+    if radius is not None and lat is None:
+        raise HTTPException(status_code=422, detail="radius requires lat and lon")
+    wanted = [f.strip() for value in (features or []) for f in value.split(",") if f.strip()]
+    return ORJSONResponse(search_outlets(db, wanted, match, lat, lon, radius, limit, resolve_open_at(open_now, open_at)))
+
+@router.get("/outlets/overlaps", response_model=OutletOverlapsResponse)
+def get_overlaps(
+    radius: int = Query(DEFAULT_OVERLAP_RADIUS_M, ge=100, le=50000, description="Circle radius in metres; outlets overlap when their centres are within 2 * radius"),
+    db: Session = Depends(get_db)
+):
+    return ORJSONResponse(get_outlet_overlaps(db, radius))
+
+@router.get("/outlets/clusters", response_model=OutletClustersResponse)
+def get_clusters(
+    zoom: int = Query(..., ge=0, le=MAX_ZOOM, description="Map zoom level (web map tiles, 0 = whole world)"),
+    bbox: Optional[str] = Query(None, description="Viewport: min_lon,min_lat,max_lon,max_lat"),
+    db: Session = Depends(get_db)
+):
+    return ORJSONResponse(get_outlet_clusters(db, zoom, parse_bbox(bbox)))
+
+@router.get("/outlets/changes", response_model=OutletChangesResponse)
+def get_changes(
+    after: int = Query(0, ge=0, description="Return change-log entries with id greater than this (use next_after)"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of entries"),
     db: Session = Depends(get_db)
 ):
-    return list_outlets(db, limit, offset)
+    return ORJSONResponse(list_outlet_changes(db, after, limit))
 
-@router.get("/outlets/{outlet_id}")
+@router.get("/outlets/{outlet_id}", response_model=OutletResponse)
 def get_outlet_by_id(outlet_id: int, db: Session = Depends(get_db)):
     outlet = get_outlet(db, outlet_id)
     if not outlet:
         raise HTTPException(status_code=404, detail="Outlet not found")
-    return outlet 
\ No newline at end of file
+    return ORJSONResponse(outlet) 
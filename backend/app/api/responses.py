@@ -0,0 +1,56 @@
+import os
+from typing import Optional
+from fastapi import Request, Response
+from ..services.payload import EncodedPayload
+
+OUTLETS_MAX_AGE = int(os.getenv("OUTLETS_CACHE_MAX_AGE", "60"))
+
+def _accepted_encodings(accept_encoding: str) -> dict:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+def negotiate_encoding(request: Request, payload: EncodedPayload) -> Optional[str]:
+    """Pick the best precompressed body the client accepts, or None for identity"""
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    for encoding in payload.encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+def cached_json_response(request: Request, payload: EncodedPayload, max_age: int = OUTLETS_MAX_AGE) -> Response:
+    """Serve a precomputed payload with ETag/Cache-Control, answering 304 on a matching If-None-Match"""
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+        "Vary": "Accept-Encoding"
+    }
+    if etag_matches(request, payload.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request, payload)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=payload.encoded(encoding), media_type="application/json", headers=headers)
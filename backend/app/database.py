@@ -1,22 +1,99 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 import os
-from dotenv import load_dotenv
+import threading
+from typing import Optional
 from .models.outlet import Outlet, Base
+from .metrics import instrument_engine
 
-load_dotenv()
+# Nothing connects at import time: the engine is created on first use (or during app warm-up),
+# so importing the app, CLIs and benchmarks stays cheap. app/.env is loaded by the package itself.
 
-# Database connection with PostgreSQL-specific configuration
-DATABASE_URL = os.getenv("DATABASE_URL")
+def database_url() -> Optional[str]:
+    return os.getenv("DATABASE_URL")
 
-# Create engine
-engine = create_engine(DATABASE_URL, echo=True)  # echo=True for debugging SQL queries
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments for a database URL, tunable through DB_* environment variables"""
+    options = {"echo": _env_bool("DB_ECHO", False)}
+    if make_url(url).get_backend_name() == "sqlite":
+        # Sessions may be used from worker threads (chatbot pool, streaming responses)
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+    options.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=_env_bool("DB_POOL_PRE_PING", True)
+    )
+    return options
+
+def _apply_sqlite_pragmas(engine: Engine, in_memory: bool):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            # WAL lets readers proceed while the scraper/geocoder write
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '20000'))}")
+        cursor.close()
+
+def create_db_engine(url: Optional[str] = None) -> Engine:
+    """Create a sync engine with pooling (PostgreSQL) or WAL/pragmas (SQLite) configured from env"""
+    url = url or database_url()
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    engine = create_engine(url, **engine_options(url))
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        _apply_sqlite_pragmas(engine, parsed.database in (None, "", ":memory:"))
+    instrument_engine(engine)
+    return engine
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """The process-wide sync engine, created on first call"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine()
+    return _engine
+
+def engine_created() -> bool:
+    return _engine is not None
+
+def __getattr__(name: str):
+    # `from app.database import engine` keeps working, creating the engine at that point
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker that binds to the engine when the first session is opened"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and local_kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 # Create tables
 def create_tables():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 # Database dependency
 def get_db():
@@ -26,13 +103,81 @@ def get_db():
     finally:
         db.close()
 
+def async_database_url(url: str) -> str:
+    """Map a sync URL onto its async driver (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+def create_async_db_engine(url: Optional[str] = None):
+    """Async counterpart of create_db_engine, with the same pool options and SQLite pragmas.
+
+    Needs the optional async driver (requirements-async.txt): asyncpg for PostgreSQL, aiosqlite for SQLite.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    url = url or database_url()
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    options = engine_options(url)
+    options.pop("connect_args", None)
+    engine = create_async_engine(async_database_url(url), **options)
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        _apply_sqlite_pragmas(engine.sync_engine, parsed.database in (None, "", ":memory:"))
+    instrument_engine(engine.sync_engine)
+    return engine
+
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    """The process-wide AsyncEngine, created on first call"""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+    return _async_engine
+
+def get_async_sessionmaker():
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_sessionmaker = async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+# Async database dependency, for endpoints that opt into AsyncSession
+async def get_async_db():
+    async with get_async_sessionmaker()() as session:
+        yield session
+
+async def dispose_async_engine():
+    """Close pooled async connections (call on application shutdown)"""
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_sessionmaker = None
+
+def get_pool_stats() -> dict:
+    """Connection pool utilization for monitoring"""
+    pool = get_engine().pool
+    stats = {"pool_class": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
 # Health check function
 def check_database_connection():
     """Check if database connection is healthy"""
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
         print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        return False
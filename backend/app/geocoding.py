@@ -1,38 +1,324 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
 from .database import SessionLocal
 from .models.outlet import Outlet
-import time
+from .repositories.outlet_repository import (
+    get_latest_change_id, get_outlet_changes, get_outlets_by_ids, get_sync_cursor, log_outlet_changes, set_sync_cursor
+)
+from .services.overlap_service import rebuild_overlap_graph
+from .services.outlet_cache import write_outlet_snapshot
 
-def geocode_address(address):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {
-        'q': address,
-        'format': 'json',
-        'limit': 1
-    }
-    response = requests.get(url, params=params, headers={"User-Agent": "mcd-geocoder/1.0"})
-    if response.status_code == 200:
+Coordinates = Tuple[float, float]
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "mcd-geocoder/1.0"
+
+GEOCODER_CACHE_PATH = os.getenv("GEOCODER_CACHE_PATH", "geocode_cache.db")
+GEOCODER_RATE_LIMIT = float(os.getenv("GEOCODER_RATE_LIMIT", "1"))  # requests per second (Nominatim policy: 1)
+GEOCODER_CONCURRENCY = int(os.getenv("GEOCODER_CONCURRENCY", "2"))
+GEOCODER_BATCH_SIZE = int(os.getenv("GEOCODER_BATCH_SIZE", "50"))
+GEOCODER_MAX_RETRIES = int(os.getenv("GEOCODER_MAX_RETRIES", "3"))
+GEOCODER_TIMEOUT = float(os.getenv("GEOCODER_TIMEOUT", "10"))
+GEOCODER_CURSOR = "geocoder"
+# Change-log entries after which an outlet may need (re)geocoding
+GEOCODE_CHANGES = ("inserted", "updated", "restored")
+
+class GeocodingError(Exception):
+    """A transient provider failure (network error, rate limiting, 5xx) that is worth retrying"""
+
+class GeocodingProvider:
+    """Resolves an address to (latitude, longitude), or None when the provider has no match"""
+    name = "base"
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class NominatimProvider(GeocodingProvider):
+    name = "nominatim"
+
+    def __init__(self, url: str = NOMINATIM_URL, pool_size: int = GEOCODER_CONCURRENCY, timeout: float = GEOCODER_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        # One pooled session shared by all workers so connections are kept alive between lookups
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        params = {'q': address, 'format': 'json', 'limit': 1}
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise GeocodingError(f"HTTP {response.status_code}")
+        if response.status_code != 200:
+            return None
         data = response.json()
         if data:
             return float(data[0]['lat']), float(data[0]['lon'])
-    return None, None
+        return None
+
+    def close(self):
+        self.session.close()
+
+class StubProvider(GeocodingProvider):
+    """Offline provider backed by a dict or callable; for tests and local development"""
+    name = "stub"
+
+    def __init__(self, lookup=None):
+        self.lookup = lookup if lookup is not None else {}
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str) -> "StubProvider":
+        with open(path, encoding="utf-8") as f:
+            return cls({address: tuple(coords) for address, coords in json.load(f).items()})
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        self.calls += 1
+        if callable(self.lookup):
+            return self.lookup(address)
+        return self.lookup.get(address)
+
+class GeocodeCache:
+    """Persistent address -> coordinates cache in a local SQLite file; misses are cached too"""
+
+    def __init__(self, path: str = GEOCODER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode_cache ("
+            "address TEXT PRIMARY KEY, latitude REAL, longitude REAL, provider TEXT, cached_at REAL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def normalize(address: str) -> str:
+        return " ".join(address.lower().split())
+
+    def get_many(self, addresses: Iterable[str]) -> Dict[str, Optional[Coordinates]]:
+        """Return cached entries for the given addresses; absent keys were never looked up"""
+        found = {}
+        with self._lock:
+            for address in addresses:
+                row = self._conn.execute(
+                    "SELECT latitude, longitude FROM geocode_cache WHERE address = ?", (self.normalize(address),)
+                ).fetchone()
+                if row is not None:
+                    found[address] = (row[0], row[1]) if row[0] is not None and row[1] is not None else None
+        return found
+
+    def put(self, address: str, coords: Optional[Coordinates], provider: str):
+        lat, lon = coords if coords else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (address, latitude, longitude, provider, cached_at) VALUES (?, ?, ?, ?, ?)",
+                (self.normalize(address), lat, lon, provider, time.time())
+            )
+            self._conn.commit()
 
-def geocode_outlets():
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class GeocodingEngine:
+    """Cached, rate-limited, concurrent geocoding over a pluggable provider"""
+
+    def __init__(self, provider: Optional[GeocodingProvider] = None, cache: Optional[GeocodeCache] = None,
+                 rate_limit: float = GEOCODER_RATE_LIMIT, concurrency: int = GEOCODER_CONCURRENCY,
+                 max_retries: int = GEOCODER_MAX_RETRIES, backoff: float = 1.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.provider = provider or NominatimProvider(pool_size=concurrency)
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.limiter = TokenBucket(rate_limit, capacity=max(1, concurrency) if rate_limit > 1 else 1)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.stats = {"cached": 0, "requested": 0, "found": 0, "failed": 0, "retries": 0}
+        # Retries are counted in the pool's worker threads; the other counters only in geocode_many's caller
+        self._stats_lock = threading.Lock()
+
+    def _lookup(self, address: str) -> Optional[Coordinates]:
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                return self.provider.geocode(address)
+            except GeocodingError as e:
+                if attempt == self.max_retries:
+                    raise
+                with self._stats_lock:
+                    self.stats["retries"] += 1
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                print(f"⏳ Retrying geocode in {delay:.1f}s ({e})")
+                self.sleep(delay)
+
+    def geocode_many(self, addresses: Iterable[str]):
+        """Yield (address, coords) pairs; cached addresses are answered without calling the provider.
+
+        Transient failures that exhaust their retries are yielded as None but not cached,
+        so the next run tries them again.
+        """
+        unique = list(dict.fromkeys(a for a in addresses if a))
+        cached = self.cache.get_many(unique)
+        for address, coords in cached.items():
+            self.stats["cached"] += 1
+            yield address, coords
+        pending = [a for a in unique if a not in cached]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {pool.submit(self._lookup, address): address for address in pending}
+            for future in as_completed(futures):
+                address = futures[future]
+                self.stats["requested"] += 1
+                try:
+                    coords = future.result()
+                except GeocodingError as e:
+                    self.stats["failed"] += 1
+                    print(f"⚠️ Geocoding gave up on '{address[:50]}': {e}")
+                    yield address, None
+                    continue
+                self.cache.put(address, coords, self.provider.name)
+                if coords:
+                    self.stats["found"] += 1
+                yield address, coords
+
+    def close(self):
+        self.provider.close()
+        self.cache.close()
+
+def geocode_address(address):
+    """Geocode a single address with Nominatim (no caching); returns (lat, lon) or (None, None)"""
+    provider = NominatimProvider(pool_size=1)
+    try:
+        coords = provider.geocode(address)
+    except GeocodingError:
+        coords = None
+    finally:
+        provider.close()
+    return coords if coords else (None, None)
+
+def _missing_coordinates(outlets):
+    return [o for o in outlets if o.latitude is None or o.longitude is None]
+
+def geocode_outlets(engine: Optional[GeocodingEngine] = None, batch_size: int = GEOCODER_BATCH_SIZE,
+                    incremental: bool = False):
+    """Fill in coordinates for outlets missing them, committing in batches.
+
+    With incremental, only outlets inserted, updated or restored since the last incremental run
+    (per the outlet change log) are considered instead of scanning the whole table.
+    """
+    owns_engine = engine is None
+    engine = engine or GeocodingEngine()
     db = SessionLocal()
     try:
-        outlets = db.query(Outlet).filter((Outlet.latitude == None) | (Outlet.longitude == None)).all()
+        cursor = None
+        if incremental:
+            cursor = get_latest_change_id(db)
+            changes = get_outlet_changes(db, get_sync_cursor(db, GEOCODER_CURSOR))
+            changed_ids = sorted({c.outlet_id for c in changes if c.id <= cursor and c.change in GEOCODE_CHANGES})
+            outlets = _missing_coordinates(get_outlets_by_ids(db, changed_ids))
+            print(f"🧾 {len(changes)} changes since the last run, {len(changed_ids)} outlets to check")
+        else:
+            outlets = db.query(Outlet).filter(
+                Outlet.deleted_at.is_(None), (Outlet.latitude == None) | (Outlet.longitude == None)
+            ).all()
+        by_address: Dict[str, list] = {}
         for outlet in outlets:
-            lat, lon = geocode_address(outlet.address)
-            if lat and lon:
-                outlet.latitude = lat
-                outlet.longitude = lon
-                print(f"✅ Geocoded: {outlet.name} -> ({lat}, {lon})")
-            else:
-                print(f"❌ Failed to geocode: {outlet.name}")
+            by_address.setdefault(outlet.address, []).append(outlet)
+        print(f"🌍 Geocoding {len(outlets)} outlets ({len(by_address)} unique addresses)")
+        pending = []
+        updated = 0
+        for address, coords in engine.geocode_many(by_address.keys()):
+            for outlet in by_address[address]:
+                if coords:
+                    outlet.latitude, outlet.longitude = coords
+                    pending.append(outlet.id)
+                    print(f"✅ Geocoded: {outlet.name} -> ({coords[0]}, {coords[1]})")
+                else:
+                    print(f"❌ Failed to geocode: {outlet.name}")
+            if len(pending) >= batch_size:
+                log_outlet_changes(db, {"geocoded": pending})
+                db.commit()
+                updated += len(pending)
+                pending = []
+        if pending:
+            log_outlet_changes(db, {"geocoded": pending})
             db.commit()
-            time.sleep(1)  # Be polite to the API
+            updated += len(pending)
+        if cursor is not None:
+            set_sync_cursor(db, GEOCODER_CURSOR, cursor)
+            db.commit()
+        if updated:
+            rebuild_overlap_graph(db)
+            write_outlet_snapshot(db)
+        print(f"🎉 Geocoding complete: {updated} outlets updated, stats={engine.stats}")
     finally:
         db.close()
+        if owns_engine:
+            engine.close()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Geocode outlets that are missing coordinates")
+    parser.add_argument("--provider", choices=["nominatim", "stub"], default="nominatim")
+    parser.add_argument("--stub-file", help="JSON object mapping address -> [lat, lon] for the stub provider")
+    parser.add_argument("--concurrency", type=int, default=GEOCODER_CONCURRENCY)
+    parser.add_argument("--rate-limit", type=float, default=GEOCODER_RATE_LIMIT, help="Requests per second")
+    parser.add_argument("--batch-size", type=int, default=GEOCODER_BATCH_SIZE)
+    parser.add_argument("--cache", default=GEOCODER_CACHE_PATH, help="Path of the on-disk geocode cache")
+    parser.add_argument("--incremental", action="store_true", help="Only check outlets changed since the last incremental run")
+    args = parser.parse_args()
+
+    if args.provider == "stub":
+        provider = StubProvider.from_file(args.stub_file) if args.stub_file else StubProvider()
+    else:
+        provider = NominatimProvider(pool_size=args.concurrency)
+    engine = GeocodingEngine(provider, GeocodeCache(args.cache), rate_limit=args.rate_limit, concurrency=args.concurrency)
+    try:
+        geocode_outlets(engine, args.batch_size, args.incremental)
+    finally:
+        engine.close()
 
 if __name__ == "__main__":
-    geocode_outlets()
+    main()
@@ -0,0 +1,238 @@
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Add a Server-Timing header (app, db and llm time) to every response
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "").strip().lower() in ("1", "true", "yes", "on")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(total)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format"""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((values, list(counts), total[0]) for values, (counts, total) in self._series.items())
+        for values, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, le)} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, values, (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """Values read at scrape time from a callback returning a number or {label value(s): number}"""
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], object], labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+        self.labels = labels
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            values = self.fn()
+        except Exception as e:
+            print(f"⚠️ Metric {self.name} failed: {e}")
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in sorted(values.items()):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value or 0)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering a name (e.g. on module reload) replaces the old metric
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], object], kind: str = "gauge", labels: Tuple[str, ...] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, kind, fn, labels))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "Database queries issued while serving a request", ("route",), QUERY_COUNT_BUCKETS
+)
+http_request_db_seconds = registry.histogram(
+    "http_request_db_seconds", "Time spent in database queries while serving a request", ("route",)
+)
+db_query_duration = registry.histogram("db_query_duration_seconds", "Latency of individual database queries")
+llm_request_duration = registry.histogram(
+    "llm_request_duration_seconds", "Latency of LLM feature-extraction calls", ("outcome",)
+)
+
+class RequestTimings:
+    """Work attributed to the request being served (shared by its worker threads)"""
+    __slots__ = ("db_queries", "db_seconds", "llm_calls", "llm_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [f"app;dur={total_seconds * 1000:.1f}"]
+        if self.db_queries:
+            parts.append(f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"')
+        if self.llm_calls:
+            parts.append(f"llm;dur={self.llm_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+def observe_db_query(seconds: float):
+    db_query_duration.observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.db_seconds += seconds
+
+def observe_llm_call(seconds: float, outcome: str):
+    llm_request_duration.observe(seconds, outcome)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.llm_calls += 1
+        timings.llm_seconds += seconds
+
+def instrument_engine(engine):
+    """Time every statement run on a (sync) engine and attribute it to the current request"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        observe_db_query(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        stack = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if stack:
+            stack.pop()
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and per-request DB/LLM work"""
+
+    def __init__(self, app, server_timing: bool = METRICS_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(time.perf_counter() - started).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_timings.reset(token)
+            route = scope.get("route")
+            # Label by route template, never the raw path, to keep series bounded
+            route_name = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(elapsed, scope["method"], route_name, str(status["code"]))
+            http_request_db_queries.observe(timings.db_queries, route_name)
+            http_request_db_seconds.observe(timings.db_seconds, route_name)
@@ -0,0 +1,134 @@
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from .database import SessionLocal, create_tables, get_engine
+from .models.outlet import Outlet, OutletFeature, OutletHours
+from .repositories.outlet_repository import hours_rows, parse_features
+
+def migrate_outlet_features(db: Session, force: bool = False) -> int:
+    """Backfill outlet_features from the legacy Outlet.features JSON text column.
+
+    Runs only when the table is empty unless force is set; returns the number of rows written.
+    """
+    if not force and db.query(OutletFeature.outlet_id).first() is not None:
+        return 0
+    db.query(OutletFeature).delete(synchronize_session=False)
+    rows = []
+    for outlet_id, raw in db.query(Outlet.id, Outlet.features).filter(Outlet.features.isnot(None)):
+        rows.extend({"outlet_id": outlet_id, "feature": f} for f in sorted(set(parse_features(raw))))
+    if rows:
+        db.bulk_insert_mappings(OutletFeature, rows)
+    db.commit()
+    return len(rows)
+
+def migrate_outlet_hours(db: Session, force: bool = False) -> int:
+    """Backfill outlet_hours by parsing the free-text Outlet.operating_hours column.
+
+    Runs only when the table is empty unless force is set; returns the number of rows written.
+    """
+    if not force and db.query(OutletHours.outlet_id).first() is not None:
+        return 0
+    db.query(OutletHours).delete(synchronize_session=False)
+    rows = []
+    for outlet_id, operating_hours in db.query(Outlet.id, Outlet.operating_hours).filter(Outlet.operating_hours.isnot(None)):
+        rows.extend(hours_rows(outlet_id, operating_hours))
+    if rows:
+        db.bulk_insert_mappings(OutletHours, rows)
+    db.commit()
+    return len(rows)
+
+def add_column_if_missing(table: str, column: str, ddl_type: str) -> bool:
+    """ALTER TABLE ... ADD COLUMN for databases created before the column existed"""
+    if column in {c["name"] for c in inspect(get_engine()).get_columns(table)}:
+        return False
+    with get_engine().begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    print(f"✅ Added column {table}.{column}")
+    return True
+
+def migrate_outlet_upsert_key():
+    """Add the content hash column and the (name, address) unique index used by bulk upserts"""
+    add_column_if_missing("outlets", "content_hash", "VARCHAR(64)")
+    with get_engine().begin() as conn:
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_outlets_name_address ON outlets (name, address)"
+        ))
+
+def migrate_outlet_soft_delete():
+    """Add the soft-delete column used by incremental scraping"""
+    add_column_if_missing("outlets", "deleted_at", "TIMESTAMP")
+
+# Arbitrary application-wide key for PostgreSQL's advisory lock
+MIGRATION_LOCK_KEY = 0x6D63646F
+
+@contextmanager
+def migration_lock():
+    """Serialize migrations across processes (e.g. API workers starting together).
+
+    PostgreSQL takes a session advisory lock; a SQLite file database locks a sidecar file. In-memory
+    SQLite and platforms without fcntl run unlocked, since only one process can be involved there.
+    """
+    url = get_engine().url
+    if url.get_backend_name() == "postgresql":
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        return
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:") or fcntl is None:
+        yield
+        return
+    with open(f"{url.database}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def run_migrations():
+    """Create missing tables and backfill derived data; safe to run repeatedly and concurrently"""
+    with migration_lock():
+        _run_migrations()
+
+def _run_migrations():
+    create_tables()
+    migrate_outlet_upsert_key()
+    migrate_outlet_soft_delete()
+    db = SessionLocal()
+    try:
+        written = migrate_outlet_features(db)
+        if written:
+            print(f"✅ Migrated {written} outlet feature rows into outlet_features")
+        written = migrate_outlet_hours(db)
+        if written:
+            print(f"✅ Migrated {written} opening-hours rows into outlet_hours")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    import sys
+    if "--snapshot" in sys.argv:
+        # Write the shared outlet snapshot (OUTLET_SNAPSHOT_PATH) without waiting for a scrape
+        from .services.outlet_cache import write_outlet_snapshot
+        db = SessionLocal()
+        try:
+            if write_outlet_snapshot(db) is None:
+                print("⚠️ OUTLET_SNAPSHOT_PATH is not set")
+        finally:
+            db.close()
+    elif "--force" in sys.argv:
+        create_tables()
+        db = SessionLocal()
+        try:
+            print(f"✅ Rebuilt {migrate_outlet_features(db, force=True)} outlet feature rows")
+            print(f"✅ Rebuilt {migrate_outlet_hours(db, force=True)} opening-hours rows")
+        finally:
+            db.close()
+    else:
+        run_migrations()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -12,4 +12,80 @@ class Outlet(Base):
     waze_link = Column(String(500))
     latitude = Column(Float)
     longitude = Column(Float)
-    features = Column(Text)  # Store outlet features as JSON string 
\ No newline at end of file
+    features = Column(Text)  # Store outlet features as JSON string (indexed copy lives in outlet_features)
+    content_hash = Column(String(64))  # Hash of the last scraped record, used to skip unchanged upserts
+    deleted_at = Column(DateTime)  # Set when a complete scrape pass no longer lists the outlet (soft delete)
+    __table_args__ = (
+        # Upsert key for scraper ingestion
+        Index("uq_outlets_name_address", "name", "address", unique=True),
+    )
+
+class OutletFeature(Base):
+    """One row per (outlet, feature); the indexed form of Outlet.features used for filtering"""
+    __tablename__ = "outlet_features"
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    feature = Column(String(100), primary_key=True)
+    __table_args__ = (
+        Index("ix_outlet_features_feature_outlet", "feature", "outlet_id"),
+    )
+
+class OutletHours(Base):
+    """One row per opening range: weekday (Monday = 0) and minutes from local midnight, close exclusive.
+
+    Parsed from Outlet.operating_hours at ingest; ranges crossing midnight are split across two days.
+    """
+    __tablename__ = "outlet_hours"
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    weekday = Column(Integer, primary_key=True)
+    open_minute = Column(Integer, primary_key=True)
+    close_minute = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_outlet_hours_weekday_open_close", "weekday", "open_minute", "close_minute"),
+    )
+
+class DatasetVersion(Base):
+    """Monotonic version counter bumped whenever a dataset (e.g. outlets) is written"""
+    __tablename__ = "dataset_versions"
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class OutletChange(Base):
+    """Append-only log of outlet writes; readers follow it by id to process only deltas"""
+    __tablename__ = "outlet_changes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), nullable=False, index=True)
+    change = Column(String(16), nullable=False)  # inserted, updated, deleted, restored, geocoded
+    dataset_version = Column(Integer, nullable=False, index=True)
+    changed_at = Column(DateTime, server_default=func.now())
+
+class ScrapePage(Base):
+    """Fingerprint of a scraped result page and the outlets it listed, per state"""
+    __tablename__ = "scrape_pages"
+    state = Column(String(100), primary_key=True)
+    page_number = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    outlet_keys = Column(Text, nullable=False)  # JSON list of [name, address]
+    scraped_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class SyncCursor(Base):
+    """Last outlet_changes id a consumer (e.g. the geocoder) has processed"""
+    __tablename__ = "sync_cursors"
+    name = Column(String(50), primary_key=True)
+    change_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class OutletOverlap(Base):
+    """Pair of outlets whose service circles of radius_m intersect (stored once, outlet_id < neighbour_id)"""
+    __tablename__ = "outlet_overlaps"
+    radius_m = Column(Integer, primary_key=True)
+    outlet_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True)
+    neighbour_id = Column(Integer, ForeignKey("outlets.id", ondelete="CASCADE"), primary_key=True, index=True)
+    distance_m = Column(Float, nullable=False)
+
+class OverlapGraph(Base):
+    """Records which outlets dataset version the persisted overlap graph for a radius was built from"""
+    __tablename__ = "overlap_graphs"
+    radius_m = Column(Integer, primary_key=True)
+    dataset_version = Column(Integer, nullable=False)
+    built_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
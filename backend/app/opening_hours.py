@@ -0,0 +1,96 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+# Malaysia has no daylight saving time, so a fixed offset is exact
+OUTLET_TIMEZONE = timezone(timedelta(hours=8), "MYT")
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# (weekday, open_minute, close_minute): Monday is 0, minutes from local midnight, close is exclusive
+HoursRow = Tuple[int, int, int]
+
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?"
+_RANGE_RE = re.compile(_TIME + r"\s*(?:-|–|to)\s*" + _TIME, re.IGNORECASE)
+_COMPACT_RANGE_RE = re.compile(r"\b(\d{2})(\d{2})\s*(?:-|–|to)\s*(\d{2})(\d{2})\b")
+
+def _to_minute(hour: str, minute: Optional[str], meridiem: Optional[str]) -> Optional[int]:
+    h = int(hour)
+    m = int(minute) if minute else 0
+    if meridiem:
+        meridiem = meridiem.lower().replace(".", "")
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12 + (12 if meridiem == "pm" else 0)
+    if h > 24 or m > 59 or (h == 24 and m):
+        return None
+    return h * 60 + m
+
+def _daily(open_minute: int, close_minute: int) -> List[HoursRow]:
+    """Expand a daily open/close range into per-weekday rows, splitting ranges that cross midnight"""
+    if open_minute == close_minute:
+        return [(day, 0, MINUTES_PER_DAY) for day in range(7)]
+    rows = []
+    for day in range(7):
+        if close_minute > open_minute:
+            rows.append((day, open_minute, close_minute))
+        else:
+            rows.append((day, open_minute, MINUTES_PER_DAY))
+            if close_minute:
+                rows.append(((day + 1) % 7, 0, close_minute))
+    return sorted(rows)
+
+def parse_operating_hours(text: Optional[str]) -> List[HoursRow]:
+    """Parse free-text hours ("24 Hours", "6am - 2am", "07:00 - 23:00") into weekday minute ranges.
+
+    Returns an empty list when the text is unknown or unparseable.
+    """
+    if not text:
+        return []
+    lowered = text.strip().lower()
+    if "24 hour" in lowered or lowered in ("24h", "24/7", "open 24 hours"):
+        return [(day, 0, MINUTES_PER_DAY) for day in range(7)]
+    compact = _COMPACT_RANGE_RE.search(lowered)
+    match = None if compact else _RANGE_RE.search(lowered)
+    if compact:
+        open_minute = _to_minute(compact.group(1), compact.group(2), None)
+        close_minute = _to_minute(compact.group(3), compact.group(4), None)
+    elif match:
+        h1, m1, mer1, h2, m2, mer2 = match.groups()
+        # "6 - 11pm": a missing opening meridiem follows the closing one unless that would reverse the range
+        if mer2 and not mer1 and int(h1) <= 12:
+            mer1 = mer2 if (int(h1) % 12) < (int(h2) % 12) else ("am" if mer2.startswith("p") else "pm")
+        open_minute = _to_minute(h1, m1, mer1)
+        close_minute = _to_minute(h2, m2, mer2)
+    else:
+        return []
+    if open_minute is None or close_minute is None:
+        return []
+    return _daily(open_minute % MINUTES_PER_DAY, close_minute % MINUTES_PER_DAY if close_minute != MINUTES_PER_DAY else 0)
+
+def to_week_intervals(rows: List[HoursRow]) -> List[Tuple[int, int]]:
+    """Convert weekday rows into sorted, merged (start, end) minute-of-week intervals"""
+    intervals = sorted((day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end) for day, start, end in rows)
+    merged: List[Tuple[int, int]] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def minute_of_week(moment: Optional[datetime] = None) -> int:
+    """Local minute of the week (Monday 00:00 = 0); naive datetimes are taken as outlet-local time"""
+    if moment is None:
+        moment = datetime.now(OUTLET_TIMEZONE)
+    elif moment.tzinfo is not None:
+        moment = moment.astimezone(OUTLET_TIMEZONE)
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+def is_open(intervals: List[Tuple[int, int]], minute: int) -> bool:
+    for start, end in intervals:
+        if start > minute:
+            return False
+        if minute < end:
+            return True
+    return False
@@ -0,0 +1,102 @@
+"""Re-run ingestion from archived result pages (see `python -m app.scraper --archive`), without a browser.
+
+    python -m app.replay archive/                          # every run under archive/, oldest first
+    python -m app.replay archive/20260101T020000Z-4242 --workers 8
+    python -m app.replay archive/ --dry-run                # parse only and report throughput
+
+Pages are parsed in a process pool. Each run is written with the same save_scrape_results call a live
+scrape makes, as soon as its last page is parsed, while the pool keeps parsing the runs after it.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy.orm import Session
+from .services.ingest_service import StatePass, save_scrape_results
+from .services.outlet_parser import page_fingerprint, parse_results_list
+from .services.page_archive import ArchivedPage, ArchivedRun, list_runs, read_page
+
+REPLAY_CHUNK_SIZE = 8  # pages per task sent to a pool worker
+
+def parse_archived_page(page: ArchivedPage) -> Tuple[str, int, str, List[dict]]:
+    """Pool worker: (state, page number, fingerprint, parsed outlets) of one archived page"""
+    html = read_page(page.path)
+    return page.state, page.number, page_fingerprint(html), parse_results_list(html)
+
+def _parsed_pages(pages: Sequence[ArchivedPage], workers: int) -> Iterator[Tuple[str, int, str, List[dict]]]:
+    if workers <= 1:
+        yield from map(parse_archived_page, pages)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields in submission order while workers run ahead, so results stream out page by page
+        yield from pool.map(parse_archived_page, pages, chunksize=REPLAY_CHUNK_SIZE)
+
+def replay_runs(db: Optional[Session], runs: List[ArchivedRun], workers: int = os.cpu_count() or 1,
+                upsert_only: bool = False) -> List[dict]:
+    """Parse and save archived runs in order; with db=None nothing is written (parser throughput only).
+
+    upsert_only treats every pass as incomplete, so old captures can add or update outlets but never
+    delete any or replace the stored page fingerprints.
+    """
+    parsed = _parsed_pages([page for run in runs for page in run.pages], workers)
+    summaries = []
+    started = time.perf_counter()
+    for run in runs:
+        run_started = time.perf_counter()
+        passes = {state: StatePass(state) for state in run.states}
+        for _ in run.pages:
+            state, number, fingerprint, outlets = next(parsed)
+            passes[state].add_page(number, fingerprint, outlets)
+        for state, complete in run.states.items():
+            passes[state].complete = complete and not upsert_only
+        parse_seconds = time.perf_counter() - run_started
+        summary = {
+            "run": run.name,
+            "pages": len(run.pages),
+            "outlets": sum(len(p.outlets) for p in passes.values()),
+            "parse_seconds": round(parse_seconds, 3)
+        }
+        if db is not None:
+            save_started = time.perf_counter()
+            counts = save_scrape_results(db, list(passes.values()), run.full_pass and not upsert_only)
+            summary["save_seconds"] = round(time.perf_counter() - save_started, 3)
+            summary.update((key, counts[key]) for key in ("inserted", "updated", "unchanged", "restored", "deleted"))
+        line = f"📼 {run.name}: {summary['pages']} pages, {summary['outlets']} outlets"
+        if db is not None:
+            line += (f", {summary['inserted']} added, {summary['updated']} updated, "
+                     f"{summary['restored']} restored, {summary['deleted']} deleted")
+        print(line)
+        summaries.append(summary)
+    elapsed = time.perf_counter() - started
+    pages = sum(s["pages"] for s in summaries)
+    print(f"⏱️ {pages} pages in {elapsed:.2f}s ({pages / elapsed if elapsed else 0:.0f} pages/s, {workers} workers)")
+    return summaries
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived scraper pages into the database")
+    parser.add_argument("paths", nargs="+", help="Archive roots or individual run directories")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes (1 parses in-process)")
+    parser.add_argument("--upsert-only", action="store_true", help="Never delete outlets, whatever the archived runs saw")
+    parser.add_argument("--dry-run", action="store_true", help="Parse only; write nothing to the database")
+    args = parser.parse_args()
+
+    runs = list_runs(args.paths)
+    if not runs:
+        print("⚠️ No archived runs found")
+        return
+    print(f"🚀 Replaying {len(runs)} runs ({sum(len(r.pages) for r in runs)} pages)...")
+    if args.dry_run:
+        replay_runs(None, runs, args.workers)
+        return
+    from .database import SessionLocal
+    from .migrations import run_migrations
+    run_migrations()
+    db = SessionLocal()
+    try:
+        replay_runs(db, runs, args.workers, args.upsert_only)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,316 @@
+from datetime import datetime
+from sqlalchemy import func, select, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..models.outlet import Outlet
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..models.outlet import (
+    Outlet, OutletChange, OutletFeature, OutletHours, DatasetVersion, OutletOverlap, OverlapGraph, ScrapePage, SyncCursor
+)
+from ..opening_hours import HoursRow, parse_operating_hours
+import hashlib
 import json
+import orjson
+
+OUTLETS_DATASET = "outlets"
+
+# Soft-deleted outlets are kept for the change log but hidden from every read
+ACTIVE = Outlet.deleted_at.is_(None)
 
 def get_all_outlets(db: Session, limit: Optional[int] = None, offset: Optional[int] = 0) -> List[Outlet]:
-    query = db.query(Outlet)
-    if limit:
-        query = query.limit(limit)
+    query = db.query(Outlet).filter(ACTIVE).order_by(Outlet.id)
     if offset:
         query = query.offset(offset)
+    if limit:
+        query = query.limit(limit)
     return query.all()
 
+def iter_outlets(db: Session, after_id: Optional[int] = None, batch_size: int = 500) -> Iterator[Outlet]:
+    """Stream outlets in id order, fetching batch_size rows at a time (server-side cursor on PostgreSQL)"""
+    query = db.query(Outlet).filter(ACTIVE).order_by(Outlet.id)
+    if after_id is not None:
+        query = query.filter(Outlet.id > after_id)
+    for outlet in query.yield_per(batch_size):
+        yield outlet
+        # Rows are only needed long enough to serialize; keep the identity map from growing
+        db.expunge(outlet)
+
 def get_outlet_by_id(db: Session, outlet_id: int) -> Optional[Outlet]:
-    return db.query(Outlet).filter(Outlet.id == outlet_id).first()
-
-def get_outlets_by_features(db: Session, features: List[str]) -> List[Outlet]:
-    outlets = db.query(Outlet).all()
-    result = []
-    for o in outlets:
-        try:
-            outlet_features = json.loads(o.features) if o.features else []
-        except json.JSONDecodeError:
-            outlet_features = []
-        if any(f in outlet_features for f in features):
-            result.append(o)
-    return result 
\ No newline at end of file
+    return db.query(Outlet).filter(Outlet.id == outlet_id, ACTIVE).first()
+
+def get_outlets_by_ids(db: Session, outlet_ids: List[int]) -> List[Outlet]:
+    if not outlet_ids:
+        return []
+    by_id = {}
+    for chunk in _chunks(list(outlet_ids)):
+        by_id.update((o.id, o) for o in db.query(Outlet).filter(Outlet.id.in_(chunk), ACTIVE))
+    # Preserve the caller's ordering (e.g. nearest first)
+    return [by_id[i] for i in outlet_ids if i in by_id]
+
+def get_outlet_coordinates(db: Session) -> List[tuple]:
+    """Return (id, latitude, longitude) for every geocoded outlet"""
+    return db.query(Outlet.id, Outlet.latitude, Outlet.longitude).filter(
+        ACTIVE,
+        Outlet.latitude.isnot(None),
+        Outlet.longitude.isnot(None)
+    ).all()
+
+def parse_features(raw: Optional[str]) -> List[str]:
+    """Decode the JSON features column, tolerating empty or malformed values"""
+    try:
+        features = orjson.loads(raw) if raw else []
+    except orjson.JSONDecodeError:
+        return []
+    return [f for f in features if isinstance(f, str)] if isinstance(features, list) else []
+
+def _feature_match_ids(features: List[str], match: str):
+    wanted = sorted(set(features))
+    matching_ids = select(OutletFeature.outlet_id).where(OutletFeature.feature.in_(wanted))
+    if match == "all":
+        matching_ids = matching_ids.group_by(OutletFeature.outlet_id).having(
+            func.count(OutletFeature.feature) == len(wanted)
+        )
+    return matching_ids
+
+def get_outlets_by_features(db: Session, features: List[str], match: str = "any") -> List[Outlet]:
+    """Outlets having any (OR) or all (AND) of the given features, via the outlet_features index"""
+    if not features:
+        return []
+    return db.query(Outlet).filter(Outlet.id.in_(_feature_match_ids(features, match)), ACTIVE).order_by(Outlet.id).all()
+
+def get_outlet_ids_by_features(db: Session, features: List[str], match: str = "any") -> List[int]:
+    """Same filter as get_outlets_by_features, answered from the index without loading outlet rows"""
+    if not features:
+        return []
+    return list(db.scalars(_feature_match_ids(features, match).distinct().order_by(OutletFeature.outlet_id)))
+
+def hours_rows(outlet_id: int, operating_hours: Optional[str]) -> List[dict]:
+    return [
+        {"outlet_id": outlet_id, "weekday": day, "open_minute": start, "close_minute": end}
+        for day, start, end in parse_operating_hours(operating_hours)
+    ]
+
+def get_all_outlet_hours(db: Session, outlet_ids: Optional[List[int]] = None) -> Dict[int, List[HoursRow]]:
+    """Structured opening ranges of every (or the given) outlets with parseable hours, keyed by outlet id"""
+    query = db.query(OutletHours.outlet_id, OutletHours.weekday, OutletHours.open_minute, OutletHours.close_minute)
+    chunks = [query.filter(OutletHours.outlet_id.in_(chunk)) for chunk in _chunks(outlet_ids)] if outlet_ids is not None else [query]
+    hours: Dict[int, List[HoursRow]] = {}
+    for chunk_query in chunks:
+        for outlet_id, weekday, open_minute, close_minute in chunk_query:
+            hours.setdefault(outlet_id, []).append((weekday, open_minute, close_minute))
+    return hours
+
+def get_dataset_version(db: Session, name: str = OUTLETS_DATASET) -> int:
+    row = db.query(DatasetVersion).filter(DatasetVersion.name == name).first()
+    return row.version if row else 0
+
+def bump_dataset_version(db: Session, name: str = OUTLETS_DATASET) -> int:
+    """Increment the dataset version; committed together with the caller's writes"""
+    row = db.query(DatasetVersion).filter(DatasetVersion.name == name).first()
+    if not row:
+        row = DatasetVersion(name=name, version=0)
+        db.add(row)
+    row.version = (row.version or 0) + 1
+    return row.version
+
+def get_overlap_graph_version(db: Session, radius_m: int) -> Optional[int]:
+    row = db.query(OverlapGraph).filter(OverlapGraph.radius_m == radius_m).first()
+    return row.dataset_version if row else None
+
+def get_overlap_edges(db: Session, radius_m: int) -> List[tuple]:
+    """Return (outlet_id, neighbour_id, distance_m) for a persisted overlap graph"""
+    return db.query(OutletOverlap.outlet_id, OutletOverlap.neighbour_id, OutletOverlap.distance_m).filter(
+        OutletOverlap.radius_m == radius_m
+    ).all()
+
+def replace_overlap_edges(db: Session, radius_m: int, edges: List[tuple], dataset_version: int):
+    """Swap the persisted overlap graph for a radius; committed by the caller"""
+    db.query(OutletOverlap).filter(OutletOverlap.radius_m == radius_m).delete(synchronize_session=False)
+    if edges:
+        db.bulk_insert_mappings(OutletOverlap, [
+            {"radius_m": radius_m, "outlet_id": a, "neighbour_id": b, "distance_m": d}
+            for a, b, d in edges
+        ])
+    row = db.query(OverlapGraph).filter(OverlapGraph.radius_m == radius_m).first()
+    if not row:
+        row = OverlapGraph(radius_m=radius_m, dataset_version=dataset_version)
+        db.add(row)
+    row.dataset_version = dataset_version
+
+UPSERT_COLUMNS = ("name", "address", "operating_hours", "waze_link", "latitude", "longitude", "features")
+UPSERT_CHUNK_SIZE = 200
+
+def outlet_content_hash(record: dict) -> str:
+    """Stable SHA-256 over the scraped fields of an outlet record"""
+    canonical = json.dumps({c: record.get(c) for c in UPSERT_COLUMNS}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _chunks(items: list, size: int = UPSERT_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _insert_for(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+    return insert
+
+def _ids_for_keys(db: Session, keys: List[tuple]) -> List[tuple]:
+    rows = []
+    for chunk in _chunks(keys):
+        rows.extend(db.query(Outlet.id, Outlet.name, Outlet.address, Outlet.content_hash).filter(
+            tuple_(Outlet.name, Outlet.address).in_(chunk)
+        ).all())
+    return rows
+
+def bulk_upsert_outlets(db: Session, records: List[dict]) -> dict:
+    """Insert or update scraped outlet records keyed by (name, address) with set-based upserts.
+
+    Records whose content hash matches the stored one are not written at all. Coordinates
+    missing from a record never overwrite geocoded ones. Committed by the caller.
+    Returns inserted/updated/unchanged counts and the affected outlet ids (changed_ids, split
+    into inserted_ids and updated_ids).
+    """
+    staged: Dict[tuple, dict] = {}
+    for record in records:
+        row = {c: record.get(c) for c in UPSERT_COLUMNS}
+        row["content_hash"] = outlet_content_hash(row)
+        staged[(row["name"], row["address"])] = row
+
+    existing = {(name, address): content_hash for _, name, address, content_hash in _ids_for_keys(db, list(staged))}
+    changed = [row for key, row in staged.items() if existing.get(key) != row["content_hash"]]
+    inserted = sum(1 for row in changed if (row["name"], row["address"]) not in existing)
+    counts = {
+        "inserted": inserted,
+        "updated": len(changed) - inserted,
+        "unchanged": len(staged) - len(changed),
+        "changed_ids": [],
+        "inserted_ids": [],
+        "updated_ids": []
+    }
+    if not changed:
+        return counts
+
+    insert = _insert_for(db)
+    for chunk in _chunks(changed):
+        stmt = insert(Outlet).values(chunk)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Outlet.name, Outlet.address],
+            set_={
+                "operating_hours": excluded.operating_hours,
+                "waze_link": excluded.waze_link,
+                "latitude": func.coalesce(excluded.latitude, Outlet.latitude),
+                "longitude": func.coalesce(excluded.longitude, Outlet.longitude),
+                "features": excluded.features,
+                "content_hash": excluded.content_hash
+            },
+            where=Outlet.content_hash.is_distinct_from(excluded.content_hash)
+        )
+        db.execute(stmt)
+
+    # Re-sync the indexed feature and opening-hours rows of every inserted/updated outlet
+    changed_rows = _ids_for_keys(db, [(row["name"], row["address"]) for row in changed])
+    changed_ids = [outlet_id for outlet_id, _, _, _ in changed_rows]
+    by_key = {(row["name"], row["address"]): row for row in changed}
+    for chunk in _chunks(changed_ids):
+        db.query(OutletFeature).filter(OutletFeature.outlet_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(OutletHours).filter(OutletHours.outlet_id.in_(chunk)).delete(synchronize_session=False)
+    feature_rows = [
+        {"outlet_id": outlet_id, "feature": f}
+        for outlet_id, name, address, _ in changed_rows
+        for f in sorted(set(parse_features(by_key[(name, address)]["features"])))
+    ]
+    if feature_rows:
+        db.bulk_insert_mappings(OutletFeature, feature_rows)
+    hour_rows = [
+        row
+        for outlet_id, name, address, _ in changed_rows
+        for row in hours_rows(outlet_id, by_key[(name, address)]["operating_hours"])
+    ]
+    if hour_rows:
+        db.bulk_insert_mappings(OutletHours, hour_rows)
+    counts["changed_ids"] = sorted(changed_ids)
+    counts["inserted_ids"] = sorted(i for i, name, address, _ in changed_rows if (name, address) not in existing)
+    counts["updated_ids"] = sorted(i for i, name, address, _ in changed_rows if (name, address) in existing)
+    return counts
+
+def get_outlet_ids_for_keys(db: Session, keys: Iterable[tuple], deleted: Optional[bool] = None) -> Dict[tuple, int]:
+    """Map (name, address) keys to outlet ids; deleted=True/False restricts to soft-deleted/active outlets"""
+    ids = {}
+    for chunk in _chunks(list(keys)):
+        query = db.query(Outlet.id, Outlet.name, Outlet.address).filter(tuple_(Outlet.name, Outlet.address).in_(chunk))
+        if deleted is not None:
+            query = query.filter(Outlet.deleted_at.isnot(None) if deleted else ACTIVE)
+        ids.update(((name, address), outlet_id) for outlet_id, name, address in query)
+    return ids
+
+def get_active_outlet_keys(db: Session) -> Dict[tuple, int]:
+    return {(name, address): outlet_id for outlet_id, name, address in db.query(Outlet.id, Outlet.name, Outlet.address).filter(ACTIVE)}
+
+def soft_delete_outlets(db: Session, outlet_ids: List[int], when: Optional[datetime] = None):
+    """Hide outlets from reads without removing them; committed by the caller"""
+    when = when or datetime.utcnow()
+    for chunk in _chunks(outlet_ids):
+        db.execute(update(Outlet).where(Outlet.id.in_(chunk), ACTIVE).values(deleted_at=when))
+
+def restore_outlets(db: Session, outlet_ids: List[int]):
+    for chunk in _chunks(outlet_ids):
+        db.execute(update(Outlet).where(Outlet.id.in_(chunk)).values(deleted_at=None))
+
+def log_outlet_changes(db: Session, changes: Dict[str, List[int]]) -> Optional[int]:
+    """Bump the dataset version and append one change row per outlet; committed by the caller.
+
+    Every logged version therefore has change rows, which lets readers apply deltas instead of
+    reloading. Returns the new version, or None when there is nothing to log.
+    """
+    rows = [(change, outlet_id) for change, outlet_ids in changes.items() for outlet_id in outlet_ids]
+    if not rows:
+        return None
+    version = bump_dataset_version(db)
+    db.bulk_insert_mappings(OutletChange, [
+        {"outlet_id": outlet_id, "change": change, "dataset_version": version} for change, outlet_id in rows
+    ])
+    return version
+
+def get_outlet_changes(db: Session, after_id: int = 0, limit: Optional[int] = None) -> List[OutletChange]:
+    query = db.query(OutletChange).filter(OutletChange.id > after_id).order_by(OutletChange.id)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+def get_latest_change_id(db: Session, max_version: Optional[int] = None) -> int:
+    query = db.query(func.max(OutletChange.id))
+    if max_version is not None:
+        query = query.filter(OutletChange.dataset_version <= max_version)
+    return query.scalar() or 0
+
+def get_sync_cursor(db: Session, name: str) -> int:
+    row = db.query(SyncCursor).filter(SyncCursor.name == name).first()
+    return row.change_id if row else 0
+
+def set_sync_cursor(db: Session, name: str, change_id: int):
+    """Record how far a consumer has processed the change log; committed by the caller"""
+    row = db.query(SyncCursor).filter(SyncCursor.name == name).first()
+    if not row:
+        row = SyncCursor(name=name, change_id=0)
+        db.add(row)
+    row.change_id = change_id
+
+def get_scrape_pages(db: Session, state: str) -> Dict[int, Tuple[str, List[tuple]]]:
+    """page_number -> (fingerprint, [(name, address), ...]) from the last complete pass of a state"""
+    return {
+        page.page_number: (page.fingerprint, [tuple(key) for key in json.loads(page.outlet_keys)])
+        for page in db.query(ScrapePage).filter(ScrapePage.state == state)
+    }
+
+def replace_scrape_pages(db: Session, state: str, pages: Dict[int, Tuple[str, List[tuple]]]):
+    """Store the page fingerprints of a complete state pass; committed by the caller"""
+    db.query(ScrapePage).filter(ScrapePage.state == state).delete(synchronize_session=False)
+    if pages:
+        db.bulk_insert_mappings(ScrapePage, [
+            {"state": state, "page_number": number, "fingerprint": fingerprint, "outlet_keys": json.dumps(keys)}
+            for number, (fingerprint, keys) in pages.items()
+        ])
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+# Response shapes of the outlet and chatbot endpoints. Records are built by
+# services.outlet_cache.outlet_to_record and returned directly as JSON, so these
+# models document the API (OpenAPI) without a per-request validation pass.
+
+class OutletResponse(BaseModel):
+    id: int
+    name: Optional[str] = None
+    address: Optional[str] = None
+    operating_hours: Optional[str] = None
+    waze_link: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    features: List[str] = []
+    neighbour_count: int = 0
+
+class RankedOutletResponse(OutletResponse):
+    """An outlet with its distance from the search point, when one was given"""
+    distance_m: Optional[float] = None
+
+class OverlapEdgeResponse(BaseModel):
+    outlet_id: int
+    neighbour_id: int
+    distance_m: float
+
+class OutletOverlapsResponse(BaseModel):
+    radius_m: int
+    edges: List[OverlapEdgeResponse]
+    neighbour_counts: Dict[int, int]
+
+class OutletClusterResponse(BaseModel):
+    id: int
+    latitude: float
+    longitude: float
+    count: int
+    # Set when the cluster is a single outlet
+    outlet_id: Optional[int] = None
+    # Zoom level at which the cluster splits into smaller ones
+    expansion_zoom: Optional[int] = None
+
+class OutletClustersResponse(BaseModel):
+    zoom: int
+    # Precomputed level the clusters come from (requests beyond the deepest level get single outlets)
+    cluster_zoom: int
+    total: int
+    clusters: List[OutletClusterResponse]
+
+class OutletChangeResponse(BaseModel):
+    id: int
+    outlet_id: int
+    change: str
+    dataset_version: int
+    changed_at: Optional[datetime] = None
+
+class OutletChangesResponse(BaseModel):
+    changes: List[OutletChangeResponse]
+    # Pass back as `after` to continue; equals the request's `after` when nothing is new
+    next_after: int
+
+class ChatbotResponse(BaseModel):
+    outlets: List[RankedOutletResponse]
+    matched_features: List[str]
+    # Place terms resolved against outlet names/addresses, when the query named one
+    matched_place: Optional[str] = None
+    # llm: features were extracted (Gemini or keyword fallback); index: the query was only a place
+    source: str
+    error: Optional[str] = None
@@ -1,266 +1,337 @@
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from queue import Queue
+from typing import Dict, List, Optional
+import os
+import threading
 import time
-import re
-from .database import SessionLocal, create_tables
-from .models.outlet import Outlet
+from .database import SessionLocal
+from .migrations import run_migrations
+from .repositories.outlet_repository import get_scrape_pages
+from .services.ingest_service import StatePass, save_scrape_results
+from .services.outlet_parser import extract_outlet_data, page_fingerprint, parse_results_list
+from .services.page_archive import SCRAPER_ARCHIVE_DIR, PageArchive
+
+BASE_URL = "https://www.mcdonalds.com.my/locate-us"
+DEFAULT_STATE = "Kuala Lumpur"
+WAIT_TIMEOUT = int(os.getenv("SCRAPER_WAIT_TIMEOUT", "15"))
+RESULT_BOX_SELECTOR = "#results .addressBox"
+NEXT_SELECTORS = [
+    ".pagination-next", ".next", ".btn-next",
+    "[class*='next']", "[aria-label*='next']",
+    "button[aria-label*='Next']", "a[aria-label*='Next']"
+]
+
+class ScrapeTimings:
+    """Thread-safe accumulator of wall-clock time spent in each scraping phase"""
 
-class McDonaldsScraper:
     def __init__(self):
-        self.base_url = "https://www.mcdonalds.com.my/locate-us"
+        self._lock = threading.Lock()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[name] = self.totals.get(name, 0.0) + elapsed
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {"seconds": round(total, 3), "count": self.counts[name]}
+                for name, total in self.totals.items()
+            }
+
+    def report(self):
+        print("\n⏱️ Phase timings:")
+        for name, entry in sorted(self.summary().items(), key=lambda item: -item[1]["seconds"]):
+            print(f"  {name:<12} {entry['seconds']:>8.3f}s  ({entry['count']}x)")
+
+class McDonaldsScraper:
+    def __init__(self, states: Optional[List[str]] = None, workers: int = 1, incremental: bool = False,
+                 full_pass: bool = False, archive_dir: Optional[str] = SCRAPER_ARCHIVE_DIR):
+        self.base_url = BASE_URL
+        self.states = states or [DEFAULT_STATE]
+        self.workers = max(1, workers)
+        # incremental: skip parsing pages whose fingerprint matches the last complete pass
+        self.incremental = incremental
+        # full_pass: the states cover the whole site, so any outlet not seen is gone
+        self.full_pass = full_pass
+        self.previous_pages: Dict[str, dict] = {}
+        # archive_dir: keep every result page's raw markup for offline replay (python -m app.replay)
+        self.archive_dir = archive_dir
+        self.archive: Optional[PageArchive] = None
         self.driver = None
         self.db = SessionLocal()
-        
+        self.timings = ScrapeTimings()
+
     def setup_driver(self):
         """Setup Chrome driver with options"""
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")  # Remove this to see the browser
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.implicitly_wait(10)
-        
+        with self.timings.phase("setup"):
+            chrome_options = Options()
+            chrome_options.add_argument("--headless")  # Remove this to see the browser
+            chrome_options.add_argument("--no-sandbox")
+            chrome_options.add_argument("--disable-dev-shm-usage")
+            chrome_options.add_argument("--window-size=1920,1080")
+            # Images are never parsed; skipping them makes every page load cheaper
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+
+            driver = webdriver.Chrome(options=chrome_options)
+            # Explicit waits only: an implicit wait would stall every failed find_elements lookup
+            driver.implicitly_wait(0)
+        if self.driver is None:
+            self.driver = driver
+        return driver
+
+    def _wait(self, driver) -> WebDriverWait:
+        return WebDriverWait(driver, WAIT_TIMEOUT)
+
+    def _first_result(self, driver):
+        boxes = driver.find_elements(By.CSS_SELECTOR, RESULT_BOX_SELECTOR)
+        return boxes[0] if boxes else None
+
+    def open_locator(self, driver):
+        with self.timings.phase("navigate"):
+            print(f"🌐 Navigating to {self.base_url}")
+            driver.get(self.base_url)
+            self._wait(driver).until(EC.element_to_be_clickable((By.ID, "states")))
+
+    def list_states(self, driver) -> List[str]:
+        """Return the state names offered by the locator's dropdown"""
+        state_select = driver.find_element(By.ID, "states")
+        names = [option.text.strip() for option in state_select.find_elements(By.TAG_NAME, 'option')]
+        return [name for name in names if name and not name.lower().startswith("select")]
+
+    def filter_by_state(self, driver, state: str) -> bool:
+        """Filter search results by state using the dropdown, waiting for the results to refresh"""
+        try:
+            print(f"🔍 Filtering by {state}...")
+            with self.timings.phase("filter"):
+                state_select = self._wait(driver).until(EC.element_to_be_clickable((By.ID, "states")))
+                for option in state_select.find_elements(By.TAG_NAME, 'option'):
+                    if option.text.strip().lower() == state.lower():
+                        option.click()
+                        break
+                else:
+                    print(f"⚠️ State not found in dropdown: {state}")
+                    return False
+                previous = self._first_result(driver)
+                driver.find_element(By.ID, "search-now").click()
+            with self.timings.phase("wait"):
+                if previous is not None:
+                    self._wait(driver).until(EC.staleness_of(previous))
+                self._wait(driver).until(EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_BOX_SELECTOR)))
+            print(f"✅ Filtered by {state} using dropdown")
+            return True
+        except (TimeoutException, WebDriverException) as e:
+            print(f"⚠️ Could not filter by {state} using dropdown: {e}")
+            return False
+
     def filter_by_kuala_lumpur(self):
         """Filter search results by Kuala Lumpur using the state dropdown"""
-        try:
-            print("🔍 Filtering by Kuala Lumpur...")
-            time.sleep(3)  # Wait for page to load
-
-            # Find the state dropdown by id 'states'
-            state_select = self.driver.find_element(By.ID, "states")
-            for option in state_select.find_elements(By.TAG_NAME, 'option'):
-                if option.text.strip().lower() == "kuala lumpur":
-                    option.click()
-                    break
-            time.sleep(2)
-
-            # Click the search button (id 'search-now')
-            search_button = self.driver.find_element(By.ID, "search-now")
-            search_button.click()
-            time.sleep(5)
-            print("✅ Filtered by Kuala Lumpur using dropdown")
-        except Exception as e:
-            print(f"⚠️ Could not filter by KL using dropdown: {e}")
-            
+        return self.filter_by_state(self.driver, DEFAULT_STATE)
+
     def extract_outlet_data(self, outlet_element):
-        """Extract data from a single outlet element"""
-        try:
-            # Get the HTML content
-            html = outlet_element.get_attribute('outerHTML')
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # First, try to extract from JSON-LD script tag
-            json_script = soup.find('script', type='application/ld+json')
-            if json_script:
-                import json
-                try:
-                    data = json.loads(json_script.string)
-                    name = data.get('name', '')
-                    address = data.get('address', '')
-                    geo = data.get('geo', {})
-                    latitude = geo.get('latitude')
-                    longitude = geo.get('longitude')
-
-                    # Always generate Waze link using latitude and longitude
-                    waze_link = ""
-                    if latitude is not None and longitude is not None:
-                        waze_link = f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude},{longitude}"
-                    
-                    # Extract all feature texts
-                    feature_elements = soup.find_all('span', class_='ed-tooltiptext')
-                    features = [el.get_text(strip=True) for el in feature_elements if el.get_text(strip=True)]
-                    
-                    # Extract operating hours from features
-                    operating_hours = "Unknown"
-                    for feature in features:
-                        if "24 hour" in feature.lower():
-                            operating_hours = "24 Hours"
-                            break
-                    if operating_hours != "24 Hours":
-                        operating_hours = "6am - 2am"
-                    
-                    return {
-                        'name': name,
-                        'address': address,
-                        'operating_hours': operating_hours,
-                        'waze_link': waze_link,
-                        'latitude': latitude,
-                        'longitude': longitude,
-                        'features': json.dumps(features)
-                    }
-                except json.JSONDecodeError:
-                    pass
-            
-        except Exception as e:
-            print(f"⚠️ Error extracting outlet data: {e}")
-            return None
-            
-    def scrape_current_page(self):
+        """Extract data from a single parsed addressBox element"""
+        return extract_outlet_data(outlet_element)
+
+    def results_html(self, driver) -> str:
+        """Markup of the result list only; smaller than page_source and free of unrelated page state"""
+        with self.timings.phase("read"):
+            return driver.find_element(By.ID, "results").get_attribute("innerHTML") or ""
+
+    def scrape_current_page(self, driver=None, html: Optional[str] = None) -> List[dict]:
         """Scrape outlets from current page"""
-        outlets = []
-        
+        driver = driver or self.driver
         try:
-            # Wait for page to load
-            time.sleep(3)
-            
-            # Look for the results container
-            results_container = self.driver.find_element(By.ID, "results")
-            
-            # Find all outlet boxes - they have class "addressBox"
-            outlet_elements = results_container.find_elements(By.CLASS_NAME, "addressBox")
-            
-            
-            print(f"📍 Found {len(outlet_elements)} outlets on this page")
-            
-            for i, element in enumerate(outlet_elements):
-                outlet_data = self.extract_outlet_data(element)
-                if outlet_data and outlet_data['name'] != "Unknown" and len(outlet_data['name']) > 3:
-                    outlets.append(outlet_data)
-                    print(f"  ✅ {outlet_data['name']} - {outlet_data['address'][:50]}...")
-                else:
-                    print(f"  ⚠️ Skipped element {i+1} (insufficient data)")
-                    
-        except Exception as e:
+            if html is None:
+                html = self.results_html(driver)
+            with self.timings.phase("parse"):
+                outlets = parse_results_list(html)
+            print(f"📍 Parsed {len(outlets)} outlets on this page")
+            return outlets
+        except WebDriverException as e:
+            print(f"❌ Error scraping current page: {e}")
+            return []
+
+    def scrape_page(self, driver, state_pass: StatePass, page_num: int):
+        """Fingerprint the current page and parse it unless an incremental run has seen it unchanged"""
+        try:
+            html = self.results_html(driver)
+        except WebDriverException as e:
             print(f"❌ Error scraping current page: {e}")
-            
-        return outlets
-    
-    def handle_pagination(self):
-        """Handle pagination to get all pages"""
-        all_outlets = []
+            return
+        if self.archive is not None:
+            with self.timings.phase("archive"):
+                self.archive.write_page(state_pass.state, page_num, html)
+        fingerprint = page_fingerprint(html)
+        previous = self.previous_pages.get(state_pass.state, {}).get(page_num)
+        if self.incremental and previous and previous[0] == fingerprint:
+            print(f"⏭️ Page unchanged, {len(previous[1])} outlets")
+            state_pass.add_page(page_num, fingerprint, keys=previous[1])
+        else:
+            state_pass.add_page(page_num, fingerprint, self.scrape_current_page(driver, html))
+
+    def _next_button(self, driver):
+        for selector in NEXT_SELECTORS:
+            buttons = driver.find_elements(By.CSS_SELECTOR, selector)
+            if buttons:
+                return buttons[0]
+        return None
+
+    def handle_pagination(self, driver=None, state_pass: Optional[StatePass] = None) -> List[dict]:
+        """Handle pagination to get all pages; the pass is marked complete only if the last page was reached"""
+        driver = driver or self.driver
+        state_pass = state_pass or StatePass(DEFAULT_STATE)
         page_num = 1
-        
+
         while True:
             print(f"\n📄 Scraping page {page_num}...")
-            
-            # Scrape current page
-            outlets = self.scrape_current_page()
-            all_outlets.extend(outlets)
-            
-            # Look for next button
+            self.scrape_page(driver, state_pass, page_num)
+
+            next_button = self._next_button(driver)
+            if not next_button or not next_button.is_enabled():
+                print("📄 No more pages")
+                state_pass.complete = True
+                break
+            previous = self._first_result(driver)
             try:
-                next_selectors = [
-                    ".pagination-next", ".next", ".btn-next", 
-                    "[class*='next']", "[aria-label*='next']",
-                    "button[aria-label*='Next']", "a[aria-label*='Next']"
-                ]
-                
-                next_button = None
-                for selector in next_selectors:
-                    try:
-                        next_button = self.driver.find_element(By.CSS_SELECTOR, selector)
-                        break
-                    except:
-                        continue
-                
-                if next_button and next_button.is_enabled():
-                    next_button.click()
-                    time.sleep(3)  # Wait for page to load
-                    page_num += 1
-                else:
-                    print("📄 No more pages")
-                    break
-                    
-            except Exception as e:
-                print(f"📄 No next button found or pagination complete: {e}")
+                next_button.click()
+                with self.timings.phase("wait"):
+                    if previous is not None:
+                        self._wait(driver).until(EC.staleness_of(previous))
+                    self._wait(driver).until(EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_BOX_SELECTOR)))
+            except (TimeoutException, WebDriverException) as e:
+                print(f"📄 Pagination complete: {e.__class__.__name__}")
                 break
-                
-        return all_outlets
-        
-    def save_to_database(self, outlets):
-        """Save outlets to database"""
+            page_num += 1
+
+        return state_pass.outlets
+
+    def scrape_state(self, driver, state: str) -> StatePass:
+        state_pass = StatePass(state)
+        self.open_locator(driver)
+        if not self.filter_by_state(driver, state):
+            return state_pass
+        self.handle_pagination(driver, state_pass)
+        print(f"🏁 {state}: {len(state_pass.keys)} outlets, {len(state_pass.outlets)} parsed, "
+              f"{state_pass.skipped_pages} unchanged pages skipped")
+        return state_pass
+
+    def scrape_states(self, states: List[str]) -> List[StatePass]:
+        """Scrape states in parallel across a small pool of reused headless drivers"""
+        pool_size = min(self.workers, len(states))
+        drivers: Queue = Queue()
+        created = []
         try:
-            print(f"\n💾 Saving {len(outlets)} outlets to database...")
-            
-            for outlet_data in outlets:
-                # Check if outlet already exists
-                existing = self.db.query(Outlet).filter(
-                    Outlet.name == outlet_data['name'],
-                    Outlet.address == outlet_data['address']
-                ).first()
-                
-                if not existing:
-                    outlet = Outlet(
-                        name=outlet_data['name'],
-                        address=outlet_data['address'],
-                        operating_hours=outlet_data['operating_hours'],
-                        waze_link=outlet_data['waze_link'],
-                        latitude=outlet_data.get('latitude'),
-                        longitude=outlet_data.get('longitude'),
-                        features=outlet_data.get('features')
-                    )
-                    self.db.add(outlet)
-                    print(f"  ✅ Added: {outlet_data['name']}")
-                else:
-                    # Update existing outlet with new data if available
-                    updated = False
-                    if outlet_data.get('latitude') is not None and outlet_data.get('longitude') is not None:
-                        existing.latitude = outlet_data['latitude']
-                        existing.longitude = outlet_data['longitude']
-                        updated = True
-                    if outlet_data.get('operating_hours') is not None:
-                        existing.operating_hours = outlet_data['operating_hours']
-                        updated = True
-                    if outlet_data.get('waze_link') is not None:
-                        existing.waze_link = outlet_data['waze_link']
-                        updated = True
-                    if outlet_data.get('features') is not None:
-                        existing.features = outlet_data['features']
-                        updated = True
-                    if updated:
-                        print(f"  🔄 Updated: {outlet_data['name']}")
-                    else:
-                        print(f"  ⚠️ Skipped (exists, no new data): {outlet_data['name']}")
-                    
-            self.db.commit()
-            print("✅ All outlets saved to database!")
-            
+            for _ in range(pool_size):
+                driver = self.setup_driver()
+                created.append(driver)
+                drivers.put(driver)
+
+            def run(state: str) -> StatePass:
+                driver = drivers.get()
+                try:
+                    return self.scrape_state(driver, state)
+                finally:
+                    drivers.put(driver)
+
+            passes = []
+            with ThreadPoolExecutor(max_workers=pool_size) as pool:
+                futures = {pool.submit(run, state): state for state in states}
+                for future in as_completed(futures):
+                    try:
+                        passes.append(future.result())
+                    except Exception as e:
+                        print(f"❌ Scraping {futures[future]} failed: {e}")
+                        passes.append(StatePass(futures[future]))
+            return passes
+        finally:
+            for driver in created:
+                driver.quit()
+            self.driver = None
+
+    def save_to_database(self, passes: List[StatePass]):
+        """Upsert changed outlets, soft-delete vanished ones and log the changes in one transaction"""
+        try:
+            parsed = sum(len(p.outlets) for p in passes)
+            print(f"\n💾 Saving {parsed} parsed outlets to database...")
+            counts = save_scrape_results(self.db, passes, self.full_pass)
+            print(f"✅ Saved: {counts['inserted']} added, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+                  f"{counts['restored']} restored, {counts['deleted']} deleted, {counts['skipped_pages']} pages skipped")
+            return counts
+
         except Exception as e:
             print(f"❌ Error saving to database: {e}")
             self.db.rollback()
-            
+            return None
+
     def scrape(self):
         """Main scraping method"""
         try:
             print("🚀 Starting McDonald's outlet scraper...")
-            
-            # Setup
-            create_tables()
-            self.setup_driver()
-            
-            # Navigate to page
-            print(f"🌐 Navigating to {self.base_url}")
-            self.driver.get(self.base_url)
-            
-            # Filter by KL
-            self.filter_by_kuala_lumpur()
-            
-            # Scrape all pages
-            outlets = self.handle_pagination()
-            
-            # Save to database
-            self.save_to_database(outlets)
-            
-            print(f"\n🎉 Scraping complete! Found {len(outlets)} outlets total.")
-            
+            started = time.perf_counter()
+
+            run_migrations()
+            self.previous_pages = {state: get_scrape_pages(self.db, state) for state in self.states}
+            if self.archive_dir:
+                self.archive = PageArchive(self.archive_dir)
+            passes = self.scrape_states(self.states)
+            if self.archive is not None:
+                self.archive.finish({p.state: p.complete for p in passes}, self.full_pass)
+
+            with self.timings.phase("save"):
+                self.save_to_database(passes)
+
+            total = len(set().union(*(p.keys for p in passes))) if passes else 0
+            print(f"\n🎉 Scraping complete! Found {total} outlets total in {time.perf_counter() - started:.1f}s.")
+            self.timings.report()
+
         except Exception as e:
             print(f"❌ Scraping failed: {e}")
-            
+
         finally:
             if self.driver:
                 self.driver.quit()
             self.db.close()
 
 def main():
-    scraper = McDonaldsScraper()
+    import argparse
+    parser = argparse.ArgumentParser(description="Scrape McDonald's Malaysia outlets")
+    parser.add_argument("--states", nargs="+", default=[DEFAULT_STATE], help="States to scrape (default: Kuala Lumpur)")
+    parser.add_argument("--all-states", action="store_true", help="Scrape every state offered by the locator")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SCRAPER_WORKERS", "3")), help="Headless browsers to run in parallel")
+    parser.add_argument("--incremental", action="store_true", help="Only parse pages that changed since the last complete pass")
+    parser.add_argument("--archive", default=SCRAPER_ARCHIVE_DIR, metavar="DIR", help="Also save every result page's markup under DIR for python -m app.replay")
+    args = parser.parse_args()
+
+    states = args.states
+    if args.all_states:
+        probe = McDonaldsScraper()
+        driver = probe.setup_driver()
+        try:
+            probe.open_locator(driver)
+            states = probe.list_states(driver)
+        finally:
+            driver.quit()
+            probe.db.close()
+        print(f"🗺️ Scraping {len(states)} states: {', '.join(states)}")
+
+    # Only a scrape of every state can tell that an outlet not seen anywhere is gone
+    scraper = McDonaldsScraper(states, args.workers, args.incremental, full_pass=args.all_states, archive_dir=args.archive)
     scraper.scrape()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
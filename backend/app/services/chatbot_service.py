@@ -1,9 +1,14 @@
 import os
 import re
 import json
-from typing import List
-from ..services.outlet_service import find_outlets_by_features
-from google import genai
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from ..services.outlet_service import find_outlets_by_features, get_outlet_records, match_outlet_text, search_outlets
+from ..services.text_index import get_text_index, tokenize
+from ..metrics import observe_llm_call
 
 KNOWN_FEATURES = [
     "24 Hours",
@@ -18,38 +23,192 @@ KNOWN_FEATURES = [
     "WiFi"
 ]
 
+# Substrings that map a query to each feature without the LLM
+FEATURE_KEYWORDS = [
+    ("24 Hours", ("24", "hour")),
+    ("Birthday Party", ("birthday", "party")),
+    ("Breakfast", ("breakfast",)),
+    ("Cashless Facility", ("cashless", "card", "payment")),
+    ("Dessert Center", ("dessert",)),
+    ("Digital Order Kiosk", ("kiosk", "digital")),
+    ("Drive-Thru", ("drive", "thru")),
+    ("McCafe", ("cafe", "coffee")),
+    ("McDelivery", ("delivery",)),
+    ("WiFi", ("wifi", "internet"))
+]
+
 def extract_features_simple(query: str) -> List[str]:
     query_lower = query.lower()
-    matched_features = []
-    if "24" in query_lower or "hour" in query_lower:
-        matched_features.append("24 Hours")
-    if "birthday" in query_lower or "party" in query_lower:
-        matched_features.append("Birthday Party")
-    if "breakfast" in query_lower:
-        matched_features.append("Breakfast")
-    if "cashless" in query_lower or "card" in query_lower or "payment" in query_lower:
-        matched_features.append("Cashless Facility")
-    if "dessert" in query_lower:
-        matched_features.append("Dessert Center")
-    if "kiosk" in query_lower or "digital" in query_lower:
-        matched_features.append("Digital Order Kiosk")
-    if "drive" in query_lower or "thru" in query_lower:
-        matched_features.append("Drive-Thru")
-    if "cafe" in query_lower or "coffee" in query_lower:
-        matched_features.append("McCafe")
-    if "delivery" in query_lower:
-        matched_features.append("McDelivery")
-    if "wifi" in query_lower or "internet" in query_lower:
-        matched_features.append("WiFi")
-    return matched_features
+    return [feature for feature, keywords in FEATURE_KEYWORDS if any(k in query_lower for k in keywords)]
 
-def extract_features_with_gemini(query: str) -> List[str]:
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return extract_features_simple(query)
-    try:
-        client = genai.Client(api_key=api_key)
-        prompt = f"""
+def _is_feature_word(token: str) -> bool:
+    return any(k in token for _, keywords in FEATURE_KEYWORDS for k in keywords)
+
+# Words that introduce a place ("near Bukit Bintang"); the terms after them may be misspelled
+LOCATION_CUES = frozenset(["near", "in", "at", "around", "by", "from", "nearby", "beside", "opposite", "off", "along"])
+# Words that end a place phrase
+PLACE_BREAKS = frozenset(["with", "and", "or", "that", "which", "who", "open", "opens", "having", "has", "have", "for", "serving", "serve", "serves"])
+# Filler that is never part of a place, and never worth an LLM call on its own
+QUERY_STOPWORDS = frozenset("""
+    a an any are best can closest could do does find for get give good i is it its list looking macca mcd mcds
+    mcdonald mcdonalds me mekdi my nearest of on one outlet outlets place places please restaurant restaurants
+    show some store stores the there to want what where which
+""".split()) | LOCATION_CUES | PLACE_BREAKS
+# Without a location cue, a word is only taken as a place when it is rare: common address words
+# ("jalan", "mall", "kuala") would otherwise match most outlets or narrow unrelated questions
+UNCUED_PLACE_MAX_SHARE = 0.05
+UNCUED_PLACE_MIN_COUNT = 5
+
+def _is_rare_place_word(index, token: str) -> bool:
+    return index.document_frequency(token) <= max(UNCUED_PLACE_MIN_COUNT, UNCUED_PLACE_MAX_SHARE * len(index))
+
+def extract_place_terms(db, query: str) -> Tuple[List[str], List[str], bool]:
+    """Split a query into place terms found in outlet names/addresses, the terms matched exactly
+    (those not introduced by a location cue, which must also be rare), and whether anything is left
+    for feature extraction"""
+    index = get_text_index(db)
+    terms: List[str] = []
+    exact: List[str] = []
+    remainder = False
+    cued = False
+    for token in tokenize(query):
+        if token in LOCATION_CUES:
+            cued = True
+        elif token in PLACE_BREAKS or _is_feature_word(token):
+            cued = False
+            remainder = remainder or token not in PLACE_BREAKS
+        elif token in QUERY_STOPWORDS or len(token) < 2:
+            continue
+        elif (cued or (not token.isdigit() and _is_rare_place_word(index, token))) and index.match_term(token, fuzzy=cued):
+            terms.append(token)
+            if not cued:
+                exact.append(token)
+        else:
+            remainder = True
+    return terms, exact, remainder
+
+DEFAULT_NEARBY_RESULTS = 20
+
+LLM_MODEL = "gemini-2.5-flash"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "4"))  # seconds before falling back to keyword matching
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # optional SQLite file to persist answers across restarts
+
+def normalize_query(query: str) -> str:
+    """Canonical cache key: lowercase, punctuation-insensitive, single-spaced"""
+    return " ".join(re.sub(r"[^\w\s-]", " ", query.lower()).split())
+
+class FeatureCache:
+    """Thread-safe LRU cache with TTL from normalized query to extracted features, optionally persisted"""
+
+    def __init__(self, max_size: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, path: Optional[str] = LLM_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_feature_cache (query TEXT PRIMARY KEY, features TEXT, cached_at REAL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT features, cached_at FROM llm_feature_cache WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                return None
+            features = json.loads(row[0])
+            self._store(key, row[1], features)
+            return features
+
+    def put(self, key: str, features: List[str]):
+        now = time.time()
+        with self._lock:
+            self._store(key, now, features)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_feature_cache (query, features, cached_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(features), now)
+                )
+                self._conn.commit()
+
+    def _store(self, key: str, cached_at: float, features: List[str]):
+        self._entries[key] = (cached_at, features)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+feature_cache = FeatureCache()
+
+_llm_stats = {
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "llm_calls": 0,
+    "llm_errors": 0,
+    "llm_timeouts": 0,
+    "fallbacks": 0,
+    "llm_latency_seconds_total": 0.0,
+    "llm_latency_seconds_max": 0.0
+}
+_stats_lock = threading.Lock()
+
+def _count(name: str, amount=1):
+    with _stats_lock:
+        _llm_stats[name] += amount
+
+def get_llm_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_llm_stats)
+    lookups = stats["cache_hits"] + stats["cache_misses"]
+    stats["cache_hit_rate"] = round(stats["cache_hits"] / lookups, 4) if lookups else 0.0
+    stats["llm_latency_seconds_avg"] = round(stats["llm_latency_seconds_total"] / stats["llm_calls"], 4) if stats["llm_calls"] else 0.0
+    stats["cache_size"] = len(feature_cache)
+    return stats
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+def get_genai_client(api_key: str):
+    """One shared Gemini client per API key, so connections are reused across requests"""
+    global _client, _client_key
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            # Imported on first use: google.genai is slow to import and unused without an API key
+            from google import genai
+            from google.genai import types
+            _client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(timeout=int(LLM_TIMEOUT * 1000))
+            )
+            _client_key = api_key
+        return _client
+
+def _call_gemini(api_key: str, query: str) -> Optional[List[str]]:
+    """Ask Gemini for features; returns None when the answer is unusable"""
+    client = get_genai_client(api_key)
+    prompt = f"""
 You are an assistant for a McDonald's outlet search. Given a user query, extract which of the following features are being asked about (if any):
 {', '.join(KNOWN_FEATURES)}
 
@@ -57,26 +216,84 @@ User query: '{query}'
 
 Return a JSON array of the relevant features from the list above that match the user's intent. Only include features from the list. If none match, return an empty array.
 """
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
-        text = getattr(response, 'text', None)
-        if not text:
-            return extract_features_simple(query)
-        match = re.search(r'\[.*?\]', text, re.DOTALL)
-        if match:
-            features = json.loads(match.group(0))
-            if isinstance(features, list):
-                return [f for f in features if f in KNOWN_FEATURES]
+    response = client.models.generate_content(
+        model=LLM_MODEL,
+        contents=prompt
+    )
+    text = getattr(response, 'text', None)
+    if not text:
+        return None
+    match = re.search(r'\[.*?\]', text, re.DOTALL)
+    if match:
+        features = json.loads(match.group(0))
+        if isinstance(features, list):
+            return [f for f in features if f in KNOWN_FEATURES]
+    return None
+
+def extract_features_with_gemini(query: str) -> List[str]:
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
         return extract_features_simple(query)
-    except Exception:
+    key = normalize_query(query)
+    cached = feature_cache.get(key)
+    if cached is not None:
+        _count("cache_hits")
+        return cached
+    _count("cache_misses")
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        features = _call_gemini(api_key, query)
+        if features is None:
+            outcome = "unusable"
+    except Exception as e:
+        features = None
+        outcome = "error"
+        _count("llm_errors")
+        if time.perf_counter() - started >= LLM_TIMEOUT:
+            outcome = "timeout"
+            _count("llm_timeouts")
+        print(f"⚠️ Gemini feature extraction failed: {e.__class__.__name__}")
+    finally:
+        elapsed = time.perf_counter() - started
+        with _stats_lock:
+            _llm_stats["llm_calls"] += 1
+            _llm_stats["llm_latency_seconds_total"] += elapsed
+            _llm_stats["llm_latency_seconds_max"] = max(_llm_stats["llm_latency_seconds_max"], elapsed)
+        observe_llm_call(elapsed, outcome)
+    if features is None:
+        # Don't cache fallbacks: the next identical query should get another chance at the LLM
+        _count("fallbacks")
         return extract_features_simple(query)
+    feature_cache.put(key, features)
+    return features
 
-def chatbot_search(db, query: str):
-    features = extract_features_with_gemini(query)
+def chatbot_search(db, query: str, latitude: Optional[float] = None, longitude: Optional[float] = None,
+                   radius: Optional[float] = None, limit: int = DEFAULT_NEARBY_RESULTS):
+    # Place names are resolved locally against the name/address index; only the rest needs the LLM
+    place_terms, exact_terms, remainder = extract_place_terms(db, query)
+    ranked = match_outlet_text(db, place_terms, exact=tuple(exact_terms))
+    place = " ".join(place_terms) if ranked else None
+    place_ids = frozenset(outlet_id for outlet_id, _ in ranked) if ranked else None
+    if place and not remainder:
+        features, source = [], "index"
+    else:
+        features, source = extract_features_with_gemini(query), "llm"
+    located = latitude is not None and longitude is not None
     if features:
-        result = find_outlets_by_features(db, features)
-        return {"outlets": result, "matched_features": features, "source": "llm"}
+        if located:
+            # With a user position, return only the nearest matches instead of every match
+            result = search_outlets(db, features, "any", latitude, longitude, radius, limit, outlet_ids=place_ids)
+        else:
+            result = find_outlets_by_features(db, features)
+            if place_ids is not None:
+                rank = {outlet_id: i for i, (outlet_id, _) in enumerate(ranked)}
+                result = sorted((r for r in result if r["id"] in place_ids), key=lambda r: rank[r["id"]])
+    elif place_ids is not None:
+        if located:
+            result = search_outlets(db, None, "any", latitude, longitude, radius, limit, outlet_ids=place_ids)
+        else:
+            result = get_outlet_records(db, [outlet_id for outlet_id, _ in ranked])
     else:
-        return {"outlets": [], "matched_features": [], "source": "llm"} 
\ No newline at end of file
+        result = []
+    return {"outlets": result, "matched_features": features, "matched_place": place, "source": source}
@@ -0,0 +1,164 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .spatial_index import SpatialIndex, get_spatial_index
+
+# Zoom levels follow web map tiles (256 px, zoom 0 = whole world). Clusters are precomputed for
+# MIN_ZOOM..MAX_CLUSTER_ZOOM; any deeper zoom returns every outlet on its own.
+MIN_ZOOM = 0
+MAX_CLUSTER_ZOOM = 16
+MAX_ZOOM = 22
+CLUSTER_RADIUS_PX = 60
+TILE_SIZE = 256
+MAX_MERCATOR_LAT = 85.05112878
+
+def project(lat: float, lon: float) -> Tuple[float, float]:
+    """Web Mercator position normalized to [0, 1] on both axes (y grows southwards)"""
+    sin_lat = math.sin(math.radians(max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))))
+    y = 0.5 - 0.25 * math.log((1 + sin_lat) / (1 - sin_lat)) / math.pi
+    return lon / 360 + 0.5, y
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, (x - 0.5) * 360
+
+class Cluster:
+    """A group of outlets at one zoom level; count == 1 is a single outlet"""
+    __slots__ = ("id", "x", "y", "count", "outlet_id", "expansion_zoom")
+
+    def __init__(self, cluster_id: int, x: float, y: float, count: int,
+                 outlet_id: Optional[int] = None, expansion_zoom: Optional[int] = None):
+        self.id = cluster_id
+        self.x = x
+        self.y = y
+        self.count = count
+        self.outlet_id = outlet_id
+        self.expansion_zoom = expansion_zoom
+
+    def to_dict(self) -> dict:
+        lat, lon = unproject(self.x, self.y)
+        return {
+            "id": self.id,
+            "latitude": round(lat, 6),
+            "longitude": round(lon, 6),
+            "count": self.count,
+            "outlet_id": self.outlet_id,
+            "expansion_zoom": self.expansion_zoom
+        }
+
+class _Level:
+    """The clusters of one zoom level, bucketed by grid cell for viewport queries"""
+
+    def __init__(self, cell_size: float, items: List[Cluster]):
+        self.cell_size = cell_size
+        self.size = len(items)
+        self.cells: Dict[Tuple[int, int], List[Cluster]] = {}
+        for item in items:
+            self.cells.setdefault(self._cell(item.x, item.y), []).append(item)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def within(self, min_x: float, min_y: float, max_x: float, max_y: float) -> List[Cluster]:
+        min_i, min_j = self._cell(min_x, min_y)
+        max_i, max_j = self._cell(max_x, max_y)
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(self.cells):
+            buckets = (b for key, b in self.cells.items() if min_i <= key[0] <= max_i and min_j <= key[1] <= max_j)
+        else:
+            buckets = (self.cells[(i, j)] for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1) if (i, j) in self.cells)
+        return [c for bucket in buckets for c in bucket if min_x <= c.x <= max_x and min_y <= c.y <= max_y]
+
+    def all(self) -> List[Cluster]:
+        return [c for bucket in self.cells.values() for c in bucket]
+
+class ClusterIndex:
+    """Hierarchical grid clustering precomputed for every zoom level (supercluster-style).
+
+    Level z merges the clusters of level z + 1 that fall in the same grid cell, cells being
+    radius_px screen pixels wide at zoom z, and places the parent at its children's weighted
+    centroid. Every cluster is therefore a union of clusters one level down, and expansion_zoom
+    is the first zoom at which it splits.
+    """
+
+    def __init__(self, index: SpatialIndex, radius_px: int = CLUSTER_RADIUS_PX,
+                 min_zoom: int = MIN_ZOOM, max_zoom: int = MAX_CLUSTER_ZOOM):
+        self.version = index.version
+        self.radius_px = radius_px
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.levels: Dict[int, _Level] = {}
+        items = []
+        for outlet_id, lat, lon in index.points():
+            x, y = project(lat, lon)
+            items.append(Cluster(self._encode(len(items), max_zoom + 1), x, y, 1, outlet_id))
+        self.size = len(items)
+        self.levels[max_zoom + 1] = _Level(self._cell_size(max_zoom + 1), items)
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            items = self._merge(items, zoom)
+            self.levels[zoom] = _Level(self._cell_size(zoom), items)
+
+    def _cell_size(self, zoom: int) -> float:
+        return self.radius_px / (TILE_SIZE * 2 ** zoom)
+
+    @staticmethod
+    def _encode(index: int, zoom: int) -> int:
+        # Ids are unique across levels: position within the level, then the zoom in the low 5 bits
+        return (index << 5) | zoom
+
+    def _merge(self, children: List[Cluster], zoom: int) -> List[Cluster]:
+        size = self._cell_size(zoom)
+        groups: Dict[Tuple[int, int], List[Cluster]] = {}
+        for child in children:
+            groups.setdefault((math.floor(child.x / size), math.floor(child.y / size)), []).append(child)
+        parents = []
+        for group in groups.values():
+            cluster_id = self._encode(len(parents), zoom)
+            if len(group) == 1:
+                child = group[0]
+                parents.append(Cluster(cluster_id, child.x, child.y, child.count, child.outlet_id, child.expansion_zoom))
+                continue
+            count = sum(c.count for c in group)
+            x = sum(c.x * c.count for c in group) / count
+            y = sum(c.y * c.count for c in group) / count
+            parents.append(Cluster(cluster_id, x, y, count, expansion_zoom=zoom + 1))
+        return parents
+
+    def level_for(self, zoom: int) -> int:
+        return max(self.min_zoom, min(zoom, self.max_zoom + 1))
+
+    def clusters(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[Cluster]:
+        """Clusters at a zoom level whose centroid lies in bbox (min_lon, min_lat, max_lon, max_lat)"""
+        level = self.levels[self.level_for(zoom)]
+        if bbox is None:
+            return level.all()
+        min_lon, min_lat, max_lon, max_lat = bbox
+        min_x, max_y = project(min_lat, min_lon)
+        max_x, min_y = project(max_lat, max_lon)
+        return level.within(min_x, min_y, max_x, max_y)
+
+    def to_dict(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> dict:
+        clusters = self.clusters(zoom, bbox)
+        clusters.sort(key=lambda c: (-c.count, c.id))
+        return {
+            "zoom": zoom,
+            "cluster_zoom": self.level_for(zoom),
+            "total": sum(c.count for c in clusters),
+            "clusters": [c.to_dict() for c in clusters]
+        }
+
+_clusters: Optional[ClusterIndex] = None
+_clusters_lock = threading.Lock()
+
+def get_cluster_index(db: Session) -> ClusterIndex:
+    """Return the process-wide cluster pyramid, rebuilding every zoom level when the dataset version changes"""
+    global _clusters
+    index = get_spatial_index(db)
+    clusters = _clusters
+    if clusters is not None and clusters.version == index.version:
+        return clusters
+    with _clusters_lock:
+        if _clusters is None or _clusters.version != index.version:
+            _clusters = ClusterIndex(index)
+            print(f"🧩 Built cluster index: {_clusters.size} outlets, zoom {MIN_ZOOM}-{MAX_CLUSTER_ZOOM} (dataset v{index.version})")
+        return _clusters
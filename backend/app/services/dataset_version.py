@@ -0,0 +1,30 @@
+import os
+import threading
+import time
+from sqlalchemy.orm import Session
+from ..repositories.outlet_repository import get_dataset_version
+
+# How long (seconds) a read trusts the last seen dataset version before re-checking the database.
+# Writers (scraper, geocoder) bump the version, so caches in every API process refresh within this window.
+VERSION_CHECK_TTL = float(os.getenv("OUTLET_CACHE_TTL", "5"))
+
+_version = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+def current_dataset_version(db: Session) -> int:
+    """Outlets dataset version, re-read from the database at most once per VERSION_CHECK_TTL"""
+    global _version, _checked_at
+    now = time.monotonic()
+    if _version is not None and now - _checked_at < VERSION_CHECK_TTL:
+        return _version
+    with _lock:
+        if _version is None or time.monotonic() - _checked_at >= VERSION_CHECK_TTL:
+            _version = get_dataset_version(db)
+            _checked_at = time.monotonic()
+        return _version
+
+def expire_dataset_version():
+    """Force the next read to re-check the version (used after in-process writes)"""
+    global _checked_at
+    _checked_at = 0.0
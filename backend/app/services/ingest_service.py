@@ -0,0 +1,105 @@
+import os
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..repositories.outlet_repository import (
+    bulk_upsert_outlets, get_active_outlet_keys, get_outlet_ids_for_keys, get_scrape_pages, log_outlet_changes,
+    replace_scrape_pages, restore_outlets, soft_delete_outlets
+)
+from .dataset_version import expire_dataset_version
+from .outlet_cache import write_outlet_snapshot
+from .overlap_service import rebuild_overlap_graph
+
+# A pass that loses more than this share of the outlets it previously listed is treated as a
+# broken scrape (site change, partial load) and deletes nothing
+SCRAPER_MAX_DELETE_RATIO = float(os.getenv("SCRAPER_MAX_DELETE_RATIO", "0.2"))
+
+OutletKey = Tuple[str, str]
+
+class StatePass:
+    """What one state's scrape saw: parsed records of changed pages, plus every page's fingerprint
+    and outlet keys (unchanged pages contribute keys without being parsed)"""
+
+    def __init__(self, state: str):
+        self.state = state
+        self.outlets: List[dict] = []
+        self.pages: Dict[int, Tuple[str, List[OutletKey]]] = {}
+        self.skipped_pages = 0
+        self.complete = False
+
+    def add_page(self, number: int, fingerprint: str, outlets: Optional[List[dict]] = None,
+                 keys: Optional[List[OutletKey]] = None):
+        if outlets is not None:
+            self.outlets.extend(outlets)
+            keys = [(o["name"], o["address"]) for o in outlets]
+        else:
+            self.skipped_pages += 1
+        self.pages[number] = (fingerprint, list(keys or []))
+
+    @property
+    def keys(self) -> Set[OutletKey]:
+        return {key for _, keys in self.pages.values() for key in keys}
+
+def previous_page_keys(pages: Dict[int, Tuple[str, List[OutletKey]]]) -> Set[OutletKey]:
+    return {tuple(key) for _, keys in pages.values() for key in keys}
+
+def _deletable(label: str, missing: Set[OutletKey], baseline: int, max_ratio: float) -> bool:
+    if missing and baseline and len(missing) > max_ratio * baseline:
+        print(f"⚠️ {label}: {len(missing)} of {baseline} outlets missing, above the {max_ratio:.0%} limit; not deleting")
+        return False
+    return True
+
+def save_scrape_results(db: Session, passes: List[StatePass], full_pass: bool = False,
+                        max_delete_ratio: float = SCRAPER_MAX_DELETE_RATIO) -> dict:
+    """Write one scrape run: upsert changed records, restore reappearing outlets, soft-delete missing
+    ones, remember page fingerprints, and log every change under a single dataset version.
+
+    Outlets are only deleted by complete passes: per state, those its previous pass listed but no page
+    of this run did; with full_pass (every state scraped completely), any active outlet not seen.
+    """
+    records: Dict[OutletKey, dict] = {}
+    for state_pass in passes:
+        for outlet in state_pass.outlets:
+            records.setdefault((outlet["name"], outlet["address"]), outlet)
+    seen = set(records)
+    for state_pass in passes:
+        seen |= state_pass.keys
+
+    counts = bulk_upsert_outlets(db, list(records.values()))
+    restored = sorted(get_outlet_ids_for_keys(db, seen, deleted=True).values())
+    restore_outlets(db, restored)
+
+    complete = [p for p in passes if p.complete]
+    missing: Set[OutletKey] = set()
+    if full_pass and complete and len(complete) == len(passes):
+        active = set(get_active_outlet_keys(db))
+        candidates = active - seen
+        if _deletable("Full pass", candidates, len(active), max_delete_ratio):
+            missing = candidates
+        for state_pass in complete:
+            replace_scrape_pages(db, state_pass.state, state_pass.pages)
+    else:
+        for state_pass in complete:
+            previous = previous_page_keys(get_scrape_pages(db, state_pass.state))
+            candidates = previous - seen
+            if not _deletable(state_pass.state, candidates, len(previous), max_delete_ratio):
+                # Keep the old fingerprints as the baseline for the next pass
+                continue
+            missing |= candidates
+            replace_scrape_pages(db, state_pass.state, state_pass.pages)
+    deleted = sorted(get_outlet_ids_for_keys(db, missing, deleted=False).values())
+    soft_delete_outlets(db, deleted)
+
+    version = log_outlet_changes(db, {
+        "inserted": counts["inserted_ids"],
+        "updated": counts["updated_ids"],
+        "restored": restored,
+        "deleted": deleted
+    })
+    db.commit()
+    counts.update(restored=len(restored), deleted=len(deleted), dataset_version=version,
+                  skipped_pages=sum(p.skipped_pages for p in passes))
+    if version is not None:
+        expire_dataset_version()
+        rebuild_overlap_graph(db)
+        write_outlet_snapshot(db)
+    return counts
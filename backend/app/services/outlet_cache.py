@@ -0,0 +1,312 @@
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.outlet import Outlet
+from ..repositories.outlet_repository import (
+    get_all_outlet_hours, get_all_outlets, get_latest_change_id, get_outlet_changes, get_outlet_ids_by_features,
+    get_outlets_by_ids, parse_features
+)
+from ..opening_hours import is_open, to_week_intervals
+from .dataset_version import current_dataset_version, expire_dataset_version
+from .overlap_service import get_overlap_graph
+from .outlet_snapshot import MappedOutletSnapshot, get_mapped_snapshot, snapshot_path, write_snapshot
+from .payload import EncodedPayload
+
+MAX_FEATURE_RESULT_SETS = 256
+MAX_OPEN_ID_SETS = 256
+# Apply logged changes to the previous snapshot instead of reloading, up to this many changed outlets
+MAX_DELTA_OUTLETS = 1000
+
+def outlet_to_record(outlet: Outlet, neighbour_count: int = 0) -> dict:
+    """Serialize an Outlet row into the API's outlet dict, decoding features once"""
+    return {
+        "id": outlet.id,
+        "name": outlet.name,
+        "address": outlet.address,
+        "operating_hours": outlet.operating_hours,
+        "waze_link": outlet.waze_link,
+        "latitude": outlet.latitude,
+        "longitude": outlet.longitude,
+        "features": parse_features(outlet.features),
+        "neighbour_count": neighbour_count
+    }
+
+class _Snapshot:
+    def __init__(self, version: int, records: List[dict], hours: Optional[Dict[int, List[Tuple[int, int]]]] = None,
+                 change_id: int = 0):
+        self.version = version
+        self.change_id = change_id
+        self.records = records
+        self.by_id: Dict[int, dict] = {r["id"]: r for r in records}
+        self.ids: List[int] = [r["id"] for r in records]
+        self.hours: Dict[int, List[Tuple[int, int]]] = hours or {}
+        self.feature_results: Dict[Tuple[Tuple[str, ...], str], List[dict]] = {}
+        self.feature_id_sets: Dict[Tuple[Tuple[str, ...], str], frozenset] = {}
+        self.open_id_sets: Dict[int, frozenset] = {}
+        self.payload: Optional[EncodedPayload] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def all(self) -> List[dict]:
+        return self.records
+
+    def after(self, after_id: int) -> List[dict]:
+        return self.records[bisect_right(self.ids, after_id):]
+
+    def get(self, outlet_id: int) -> Optional[dict]:
+        return self.by_id.get(outlet_id)
+
+    def get_many(self, outlet_ids: List[int]) -> List[dict]:
+        by_id = self.by_id
+        return [by_id[i] for i in outlet_ids if i in by_id]
+
+    def hours_by_id(self) -> Dict[int, List[Tuple[int, int]]]:
+        return self.hours
+
+    def feature_ids(self, db: Session, features: List[str], match: str) -> List[int]:
+        return get_outlet_ids_by_features(db, features, match)
+
+class _MappedSnapshot(_Snapshot):
+    """A snapshot backed by the shared snapshot file: records are decoded from the mapping on first
+    use, and feature filters and the full listing are answered from it without the database"""
+
+    def __init__(self, mapped: MappedOutletSnapshot):
+        super().__init__(mapped.version, [], None, mapped.change_id)
+        self.mapped = mapped
+        self.payload = mapped.payload()
+        self._decoded: Dict[int, dict] = {}
+        self._records: Optional[List[dict]] = None
+        self._hours: Optional[Dict[int, List[Tuple[int, int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.mapped)
+
+    def _record(self, i: int) -> dict:
+        record = self._decoded.get(i)
+        if record is None:
+            record = self._decoded.setdefault(i, self.mapped.record(i))
+        return record
+
+    def all(self) -> List[dict]:
+        if self._records is None:
+            self._records = [self._record(i) for i in range(len(self.mapped))]
+        return self._records
+
+    def after(self, after_id: int) -> List[dict]:
+        start = bisect_right(self.mapped.ids, after_id)
+        return [self._record(i) for i in range(start, len(self.mapped))]
+
+    def get(self, outlet_id: int) -> Optional[dict]:
+        i = self.mapped.position(outlet_id)
+        return self._record(i) if i is not None else None
+
+    def get_many(self, outlet_ids: List[int]) -> List[dict]:
+        positions = (self.mapped.position(outlet_id) for outlet_id in outlet_ids)
+        return [self._record(i) for i in positions if i is not None]
+
+    def hours_by_id(self) -> Dict[int, List[Tuple[int, int]]]:
+        if self._hours is None:
+            hours = {}
+            for i in range(len(self.mapped)):
+                intervals = self.mapped.hours(i)
+                if intervals:
+                    hours[self.mapped.ids[i]] = intervals
+            self._hours = hours
+        return self._hours
+
+    def feature_ids(self, db: Session, features: List[str], match: str) -> List[int]:
+        return self.mapped.feature_ids(features, match)
+
+class OutletCache:
+    """Process-wide read-through cache of serialized outlet records, keyed by dataset version.
+
+    Records are shared between requests and must be treated as read-only by callers.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.delta_loads = 0
+        self.mapped_loads = 0
+
+    def _current(self, db: Session) -> _Snapshot:
+        version = current_dataset_version(db)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        mapped = get_mapped_snapshot(version)
+        # Outside the lock: a cold graph means a full pair search, and other requests must not queue on it
+        neighbour_counts = get_overlap_graph(db).neighbour_counts if mapped is None else {}
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                if mapped is not None:
+                    self._snapshot = _MappedSnapshot(mapped)
+                    self.mapped_loads += 1
+                    return self._snapshot
+                snapshot = self._apply_changes(db, self._snapshot, version, neighbour_counts)
+                if snapshot is None:
+                    change_id = get_latest_change_id(db, version)
+                    outlets = sorted(get_all_outlets(db), key=lambda o: o.id)
+                    records = [outlet_to_record(o, neighbour_counts.get(o.id, 0)) for o in outlets]
+                    hours = {outlet_id: to_week_intervals(rows) for outlet_id, rows in get_all_outlet_hours(db).items()}
+                    snapshot = _Snapshot(version, records, hours, change_id)
+                    self.loads += 1
+                else:
+                    self.delta_loads += 1
+                self._snapshot = snapshot
+            return self._snapshot
+
+    def _apply_changes(self, db: Session, previous: Optional[_Snapshot], version: int,
+                       neighbour_counts: Dict[int, int]) -> Optional[_Snapshot]:
+        """Patch the previous snapshot with the outlets changed since it was loaded.
+
+        Returns None (full reload) unless the change log covers every version in between: writers
+        that bump the version without logging changes force a reload.
+        """
+        if previous is None or version <= previous.version:
+            return None
+        changes = get_outlet_changes(db, previous.change_id)
+        versions = {c.dataset_version for c in changes}
+        if not changes or not set(range(previous.version + 1, version + 1)) <= versions:
+            return None
+        changed_ids = {c.outlet_id for c in changes if c.dataset_version <= version}
+        if len(changed_ids) > MAX_DELTA_OUTLETS:
+            return None
+        fresh = {o.id: outlet_to_record(o, neighbour_counts.get(o.id, 0)) for o in get_outlets_by_ids(db, sorted(changed_ids))}
+        by_id = {}
+        for record in previous.all():
+            if record["id"] in changed_ids:
+                continue
+            count = neighbour_counts.get(record["id"], 0)
+            # Records are shared read-only, so a changed neighbour count gets a new dict
+            by_id[record["id"]] = record if record["neighbour_count"] == count else {**record, "neighbour_count": count}
+        by_id.update(fresh)
+        hours = {i: intervals for i, intervals in previous.hours_by_id().items() if i not in changed_ids}
+        hours.update((i, to_week_intervals(rows)) for i, rows in get_all_outlet_hours(db, sorted(fresh)).items())
+        change_id = max(c.id for c in changes if c.dataset_version <= version)
+        return _Snapshot(version, [by_id[i] for i in sorted(by_id)], hours, change_id)
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def all(self, db: Session) -> List[dict]:
+        version_before = self._snapshot.version if self._snapshot else None
+        snapshot = self._current(db)
+        self._record(version_before == snapshot.version)
+        return snapshot.all()
+
+    def after(self, db: Session, after_id: int) -> List[dict]:
+        """Records with id greater than after_id, in id order (keyset pagination)"""
+        version_before = self._snapshot.version if self._snapshot else None
+        snapshot = self._current(db)
+        self._record(version_before == snapshot.version)
+        return snapshot.after(after_id)
+
+    def all_encoded(self, db: Session) -> EncodedPayload:
+        """The full outlet list serialized and compressed once per dataset version"""
+        snapshot = self._current(db)
+        payload = snapshot.payload
+        self._record(payload is not None)
+        if payload is None:
+            payload = EncodedPayload(snapshot.all(), snapshot.version)
+            snapshot.payload = payload
+        return payload
+
+    def get(self, db: Session, outlet_id: int) -> Optional[dict]:
+        version_before = self._snapshot.version if self._snapshot else None
+        snapshot = self._current(db)
+        self._record(version_before == snapshot.version)
+        return snapshot.get(outlet_id)
+
+    def get_many(self, db: Session, outlet_ids: List[int]) -> List[dict]:
+        return self._current(db).get_many(outlet_ids)
+
+    def by_features(self, db: Session, features: List[str], match: str = "any") -> List[dict]:
+        snapshot = self._current(db)
+        key = (tuple(sorted(set(features))), match)
+        result = snapshot.feature_results.get(key)
+        if result is not None:
+            self._record(True)
+            return result
+        self._record(False)
+        result = snapshot.get_many(snapshot.feature_ids(db, list(key[0]), match))
+        with self._lock:
+            if len(snapshot.feature_results) >= MAX_FEATURE_RESULT_SETS:
+                snapshot.feature_results.clear()
+            snapshot.feature_results[key] = result
+        return result
+
+    def feature_ids(self, db: Session, features: List[str], match: str = "any") -> frozenset:
+        """Memoized id set for a feature filter, for cheap membership tests during ranking"""
+        snapshot = self._current(db)
+        key = (tuple(sorted(set(features))), match)
+        ids = snapshot.feature_id_sets.get(key)
+        if ids is None:
+            ids = frozenset(r["id"] for r in self.by_features(db, features, match))
+            with self._lock:
+                if len(snapshot.feature_id_sets) >= MAX_FEATURE_RESULT_SETS:
+                    snapshot.feature_id_sets.clear()
+                snapshot.feature_id_sets[key] = ids
+        return ids
+
+    def open_ids(self, db: Session, minute: int) -> frozenset:
+        """Memoized ids of outlets open at a minute of the week, from the preloaded opening ranges"""
+        snapshot = self._current(db)
+        ids = snapshot.open_id_sets.get(minute)
+        self._record(ids is not None)
+        if ids is None:
+            ids = frozenset(outlet_id for outlet_id, intervals in snapshot.hours_by_id().items() if is_open(intervals, minute))
+            with self._lock:
+                if len(snapshot.open_id_sets) >= MAX_OPEN_ID_SETS:
+                    snapshot.open_id_sets.clear()
+                snapshot.open_id_sets[minute] = ids
+        return ids
+
+    def invalidate(self):
+        """Drop cached records and re-check the dataset version on the next read"""
+        with self._lock:
+            self._snapshot = None
+        expire_dataset_version()
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "loads": self.loads,
+            "delta_loads": self.delta_loads,
+            "mapped_loads": self.mapped_loads,
+            "version": snapshot.version if snapshot else None,
+            "records": len(snapshot) if snapshot else 0,
+            "feature_result_sets": len(snapshot.feature_results) if snapshot else 0
+        }
+
+outlet_cache = OutletCache()
+
+def write_outlet_snapshot(db: Session, path: Optional[str] = None) -> Optional[int]:
+    """Write the shared snapshot file for the committed dataset (after a scrape or geocode run).
+
+    path defaults to OUTLET_SNAPSHOT_PATH. Returns the file size, or None when no path is configured.
+    """
+    path = path or snapshot_path()
+    if not path:
+        return None
+    expire_dataset_version()
+    version = current_dataset_version(db)
+    neighbour_counts = get_overlap_graph(db).neighbour_counts
+    outlets = sorted(get_all_outlets(db), key=lambda o: o.id)
+    records = [outlet_to_record(o, neighbour_counts.get(o.id, 0)) for o in outlets]
+    hours = {outlet_id: to_week_intervals(rows) for outlet_id, rows in get_all_outlet_hours(db).items()}
+    size = write_snapshot(path, version, get_latest_change_id(db, version), records, hours, EncodedPayload(records, version))
+    print(f"🗂️ Wrote outlet snapshot: {len(records)} outlets, {size / 1024:.0f} KiB (dataset v{version}) -> {path}")
+    return size
@@ -0,0 +1,82 @@
+"""Browser-free parsing of the locator's result-list markup, shared by the live scraper and archive replay"""
+from typing import List, Optional
+import hashlib
+import json
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+def extract_outlet_data(outlet_element) -> Optional[dict]:
+    """Extract data from a single parsed addressBox element"""
+    try:
+        # First, try to extract from JSON-LD script tag
+        json_script = outlet_element.find('script', type='application/ld+json')
+        if not json_script or not json_script.string:
+            return None
+        try:
+            data = json.loads(json_script.string)
+        except json.JSONDecodeError:
+            return None
+        name = data.get('name', '')
+        address = data.get('address', '')
+        geo = data.get('geo', {})
+        latitude = geo.get('latitude')
+        longitude = geo.get('longitude')
+
+        # Always generate Waze link using latitude and longitude
+        waze_link = ""
+        if latitude is not None and longitude is not None:
+            waze_link = f"https://www.waze.com/live-map/directions?navigate=yes&to=ll.{latitude},{longitude}"
+
+        # Extract all feature texts
+        feature_elements = outlet_element.find_all('span', class_='ed-tooltiptext')
+        features = [el.get_text(strip=True) for el in feature_elements if el.get_text(strip=True)]
+
+        # Extract operating hours from features
+        operating_hours = "Unknown"
+        for feature in features:
+            if "24 hour" in feature.lower():
+                operating_hours = "24 Hours"
+                break
+        if operating_hours != "24 Hours":
+            operating_hours = "6am - 2am"
+
+        return {
+            'name': name,
+            'address': address,
+            'operating_hours': operating_hours,
+            'waze_link': waze_link,
+            'latitude': latitude,
+            'longitude': longitude,
+            'features': json.dumps(features)
+        }
+    except Exception as e:
+        print(f"⚠️ Error extracting outlet data: {e}")
+        return None
+
+def page_fingerprint(results_html: str) -> str:
+    """SHA-256 of a result list's markup; equal fingerprints mean the page lists the same outlets"""
+    return hashlib.sha256(results_html.encode("utf-8")).hexdigest()
+
+def parse_results_html(html: str) -> List[dict]:
+    """Parse every outlet on a result page from one snapshot of its #results markup"""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    results_container = soup.find(id="results")
+    if results_container is None:
+        return []
+    outlets = []
+    for i, element in enumerate(results_container.find_all(class_="addressBox")):
+        outlet_data = extract_outlet_data(element)
+        if outlet_data and outlet_data['name'] != "Unknown" and len(outlet_data['name']) > 3:
+            outlets.append(outlet_data)
+        else:
+            print(f"  ⚠️ Skipped element {i+1} (insufficient data)")
+    return outlets
+
+def parse_results_list(results_html: str) -> List[dict]:
+    """Parse the inner markup of the #results list, as read from the browser or an archived page"""
+    return parse_results_html(f'<div id="results">{results_html}</div>')
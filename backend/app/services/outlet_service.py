@@ -1,63 +1,133 @@
-from typing import List, Optional
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from ..repositories.outlet_repository import get_all_outlets, get_outlet_by_id, get_outlets_by_features
-import json
-
-def list_outlets(db: Session, limit: Optional[int] = None, offset: Optional[int] = 0) -> List[dict]:
-    outlets = get_all_outlets(db, limit, offset)
-    result = []
-    for o in outlets:
-        try:
-            features = json.loads(o.features) if o.features else []
-        except json.JSONDecodeError:
-            features = []
-        result.append({
-            "id": o.id,
-            "name": o.name,
-            "address": o.address,
-            "operating_hours": o.operating_hours,
-            "waze_link": o.waze_link,
-            "latitude": o.latitude,
-            "longitude": o.longitude,
-            "features": features
-        })
-    return result
+from ..repositories.outlet_repository import get_outlet_changes, iter_outlets
+from .spatial_index import get_spatial_index
+from .overlap_service import get_overlap_graph
+from .cluster_service import get_cluster_index
+from .text_index import get_text_index
+from .outlet_cache import outlet_cache, outlet_to_record
+from .payload import EncodedPayload
 
-def get_outlet(db: Session, outlet_id: int) -> Optional[dict]:
-    outlet = get_outlet_by_id(db, outlet_id)
-    if not outlet:
+def open_outlet_ids(db: Session, open_at: Optional[int]) -> Optional[frozenset]:
+    """Ids of outlets open at a minute of the week (see opening_hours.minute_of_week), or None for no filter"""
+    return outlet_cache.open_ids(db, open_at) if open_at is not None else None
+
+def _combine(*id_sets: Optional[frozenset]) -> Optional[frozenset]:
+    filters = [ids for ids in id_sets if ids is not None]
+    if not filters:
         return None
-    try:
-        features = json.loads(outlet.features) if outlet.features else []
-    except json.JSONDecodeError:
-        features = []
-    return {
-        "id": outlet.id,
-        "name": outlet.name,
-        "address": outlet.address,
-        "operating_hours": outlet.operating_hours,
-        "waze_link": outlet.waze_link,
-        "latitude": outlet.latitude,
-        "longitude": outlet.longitude,
-        "features": features
-    }
-
-def find_outlets_by_features(db: Session, features: List[str]) -> List[dict]:
-    outlets = get_outlets_by_features(db, features)
-    result = []
-    for o in outlets:
-        try:
-            outlet_features = json.loads(o.features) if o.features else []
-        except json.JSONDecodeError:
-            outlet_features = []
-        result.append({
-            "id": o.id,
-            "name": o.name,
-            "address": o.address,
-            "operating_hours": o.operating_hours,
-            "waze_link": o.waze_link,
-            "latitude": o.latitude,
-            "longitude": o.longitude,
-            "features": outlet_features
-        })
-    return result 
\ No newline at end of file
+    return frozenset.intersection(*filters) if len(filters) > 1 else filters[0]
+
+def list_outlets(db: Session, limit: Optional[int] = None, offset: Optional[int] = 0,
+                 bbox: Optional[Tuple[float, float, float, float]] = None,
+                 after: Optional[int] = None, open_at: Optional[int] = None) -> List[dict]:
+    """Outlets in id order; `after` is a keyset cursor (last id of the previous page)"""
+    if bbox:
+        ids = get_spatial_index(db).within_bbox(*bbox)
+        if after is not None:
+            ids = ids[bisect_right(ids, after):]
+        records = outlet_cache.get_many(db, ids)
+    elif after is not None:
+        records = outlet_cache.after(db, after)
+    else:
+        records = outlet_cache.all(db)
+    if open_at is not None:
+        open_ids = open_outlet_ids(db, open_at)
+        records = [r for r in records if r["id"] in open_ids]
+    start = offset or 0
+    return records[start:start + limit] if limit else records[start:]
+
+def iter_outlet_records(db: Session, after: Optional[int] = None) -> Iterator[dict]:
+    """Stream outlet records straight from the database in id order, without materializing the table"""
+    neighbour_counts = get_overlap_graph(db).neighbour_counts
+    for o in iter_outlets(db, after):
+        yield outlet_to_record(o, neighbour_counts.get(o.id, 0))
+
+def get_outlets_payload(db: Session) -> EncodedPayload:
+    """Full outlet listing, pre-serialized and pre-compressed for the current dataset version"""
+    return outlet_cache.all_encoded(db)
+
+def get_outlet(db: Session, outlet_id: int) -> Optional[dict]:
+    return outlet_cache.get(db, outlet_id)
+
+def get_outlet_records(db: Session, outlet_ids: List[int]) -> List[dict]:
+    """Cached records for the given ids, in the given order"""
+    return outlet_cache.get_many(db, outlet_ids)
+
+def match_outlet_text(db: Session, terms: List[str], fuzzy: bool = True, exact: Tuple[str, ...] = ()) -> List[Tuple[int, float]]:
+    """Outlets whose name or address matches every term (typos tolerated), best first, as (outlet_id, score)"""
+    if not terms:
+        return []
+    return get_text_index(db).search(terms, fuzzy, exact)
+
+def find_outlets_by_features(db: Session, features: List[str], match: str = "any") -> List[dict]:
+    if not features:
+        return []
+    return outlet_cache.by_features(db, features, match)
+
+def find_nearby_outlets(db: Session, latitude: float, longitude: float,
+                        radius: Optional[float] = None, k: Optional[int] = None,
+                        open_at: Optional[int] = None) -> List[dict]:
+    """Outlets nearest to a point, each with a distance_m field, nearest first"""
+    index = get_spatial_index(db)
+    allowed = open_outlet_ids(db, open_at)
+    predicate = allowed.__contains__ if allowed is not None else None
+    if k:
+        matches = index.nearest(latitude, longitude, k, radius, predicate)
+    else:
+        matches = index.within_radius(latitude, longitude, radius, predicate)
+    distances = dict(matches)
+    return [
+        {**record, "distance_m": round(distances[record["id"]], 1)}
+        for record in outlet_cache.get_many(db, [outlet_id for outlet_id, _ in matches])
+    ]
+
+def search_outlets(db: Session, features: Optional[List[str]] = None, match: str = "any",
+                   latitude: Optional[float] = None, longitude: Optional[float] = None,
+                   radius: Optional[float] = None, limit: int = 10,
+                   open_at: Optional[int] = None, outlet_ids: Optional[frozenset] = None) -> List[dict]:
+    """Feature-filtered outlets ranked by distance from a point, top `limit` only.
+
+    `outlet_ids` further restricts the candidates (e.g. to outlets matching a place name).
+    """
+    open_ids = open_outlet_ids(db, open_at)
+    allowed = _combine(outlet_cache.feature_ids(db, features, match) if features else None, open_ids, outlet_ids)
+    if latitude is None or longitude is None:
+        records = outlet_cache.by_features(db, features, match) if features else outlet_cache.all(db)
+        if allowed is not None:
+            records = [r for r in records if r["id"] in allowed]
+        return records[:limit]
+    index = get_spatial_index(db)
+    predicate = allowed.__contains__ if allowed is not None else None
+    if allowed is not None and not allowed:
+        return []
+    matches = index.nearest(latitude, longitude, limit, radius, predicate)
+    distances = dict(matches)
+    return [
+        {**record, "distance_m": round(distances[record["id"]], 1)}
+        for record in outlet_cache.get_many(db, [outlet_id for outlet_id, _ in matches])
+    ]
+
+def get_outlet_overlaps(db: Session, radius_m: int) -> dict:
+    return get_overlap_graph(db, radius_m).to_dict()
+
+def get_outlet_clusters(db: Session, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> dict:
+    return get_cluster_index(db).to_dict(zoom, bbox)
+
+def list_outlet_changes(db: Session, after: int = 0, limit: int = 1000) -> dict:
+    """Change-log entries after a cursor, for consumers that sync deltas instead of full reloads"""
+    changes = [
+        {
+            "id": c.id,
+            "outlet_id": c.outlet_id,
+            "change": c.change,
+            "dataset_version": c.dataset_version,
+            "changed_at": c.changed_at.isoformat() if c.changed_at else None
+        }
+        for c in get_outlet_changes(db, after, limit)
+    ]
+    return {"changes": changes, "next_after": changes[-1]["id"] if changes else after}
+
+def get_outlet_cache_stats() -> dict:
+    return outlet_cache.stats()
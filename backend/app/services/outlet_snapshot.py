@@ -0,0 +1,243 @@
+"""Columnar outlet snapshot file, written by the scraper/geocoder and memory-mapped by API workers.
+
+Layout: MAGIC, a little-endian uint32 header length, a JSON header, then 8-byte aligned sections.
+Every per-outlet section is a flat array in id order:
+
+    ids                 int64
+    latitude/longitude  float64 (NaN when not geocoded)
+    feature_mask        uint64, bit i = header["features"][i] (for filtering)
+    features.*          uint8 feature indexes per outlet, in the outlet's own order (offsets + data)
+    neighbour_count     int32
+    <column>.*          utf-8 strings: uint32 offsets (count + 1) into a byte blob, plus a null flag per outlet
+    hours.*             int32 (start, end) minute-of-week pairs per outlet (offsets + data)
+    payload.*           the full GET /outlets body, identity and precompressed
+
+Workers map the file read-only, so every process shares the same page-cache pages, and a new
+snapshot is swapped in with an atomic rename: open maps keep the previous file alive until dropped.
+"""
+import mmap
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Tuple
+import orjson
+from .payload import EncodedPayload
+
+def snapshot_path() -> Optional[str]:
+    """OUTLET_SNAPSHOT_PATH, read per call so .env and late configuration apply; unset keeps reads on the database"""
+    return os.getenv("OUTLET_SNAPSHOT_PATH") or None
+
+MAGIC = b"MCDOSNP1"
+FORMAT_VERSION = 1
+STRING_COLUMNS = ("name", "address", "operating_hours", "waze_link")
+MAX_FEATURES = 64
+_ALIGN = 8
+
+def _array(typecode: str, values) -> array:
+    data = array(typecode, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+def _ragged(typecode: str, rows: List[List[int]]) -> Tuple[array, array]:
+    offsets = [0]
+    data = array(typecode)
+    for row in rows:
+        data.extend(row)
+        offsets.append(len(data))
+    return _array("I", offsets), _array(typecode, data)
+
+def _strings(values: List[Optional[str]]) -> Tuple[array, bytes, bytes]:
+    offsets = [0]
+    blob = bytearray()
+    for value in values:
+        blob += (value or "").encode("utf-8")
+        offsets.append(len(blob))
+    return _array("I", offsets), bytes(blob), bytes(value is None for value in values)
+
+def write_snapshot(path: str, version: int, change_id: int, records: List[dict],
+                   hours: Dict[int, List[Tuple[int, int]]], payload: EncodedPayload) -> int:
+    """Write records (sorted by id, as produced by outlet_to_record) to path atomically; returns the file size"""
+    features = sorted({f for record in records for f in record["features"]})
+    if len(features) > MAX_FEATURES:
+        raise ValueError(f"Snapshot supports at most {MAX_FEATURES} distinct features, got {len(features)}")
+    bit = {feature: i for i, feature in enumerate(features)}
+    nan = float("nan")
+    sections = {
+        "ids": _array("q", (r["id"] for r in records)),
+        "latitude": _array("d", (nan if r["latitude"] is None else r["latitude"] for r in records)),
+        "longitude": _array("d", (nan if r["longitude"] is None else r["longitude"] for r in records)),
+        "feature_mask": _array("Q", (sum(1 << bit[f] for f in set(r["features"])) for r in records)),
+        "neighbour_count": _array("i", (r["neighbour_count"] for r in records))
+    }
+    sections["features.offsets"], sections["features.data"] = _ragged("B", [[bit[f] for f in r["features"]] for r in records])
+    for column in STRING_COLUMNS:
+        offsets, blob, nulls = _strings([r[column] for r in records])
+        sections[f"{column}.offsets"], sections[f"{column}.data"], sections[f"{column}.null"] = offsets, blob, nulls
+    sections["hours.offsets"], sections["hours.data"] = _ragged(
+        "i", [[minute for interval in hours.get(r["id"], []) for minute in interval] for r in records]
+    )
+    sections["payload.identity"] = payload.body
+    sections["payload.gzip"] = payload.gzip_body
+    if payload.br_body is not None:
+        sections["payload.br"] = payload.br_body
+
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else "B"
+        size = len(data) * (data.itemsize if isinstance(data, array) else 1)
+        layout[name] = [offset, size, typecode]
+        offset += size + (-size % _ALIGN)
+    header = orjson.dumps({
+        "format": FORMAT_VERSION,
+        "dataset_version": version,
+        "change_id": change_id,
+        "count": len(records),
+        "features": features,
+        "etag": payload.etag,
+        "sections": layout
+    })
+    start = len(MAGIC) + 4 + len(header)
+    start += -start % _ALIGN
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(4, "little") + header)
+        f.write(b"\0" * (start - f.tell()))
+        for name, data in sections.items():
+            raw = data.tobytes() if isinstance(data, array) else data
+            f.write(raw + b"\0" * (-len(raw) % _ALIGN))
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers either see the old file or the complete new one, never a partial write
+    os.replace(tmp_path, path)
+    return start + offset
+
+class MappedOutletSnapshot:
+    """Read-only view of a snapshot file; columns are memoryviews over the shared mapping"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        buffer = memoryview(self._map)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an outlet snapshot")
+        header_size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 4], "little")
+        header_start = len(MAGIC) + 4
+        header = orjson.loads(buffer[header_start:header_start + header_size])
+        if header["format"] != FORMAT_VERSION or sys.byteorder != "little":
+            raise ValueError(f"{path} has an unsupported snapshot format")
+        start = header_start + header_size
+        start += -start % _ALIGN
+        self.version: int = header["dataset_version"]
+        self.change_id: int = header["change_id"]
+        self.count: int = header["count"]
+        self.features: List[str] = header["features"]
+        self.etag: str = header["etag"]
+        self._sections: Dict[str, memoryview] = {}
+        for name, (offset, size, typecode) in header["sections"].items():
+            self._sections[name] = buffer[start + offset:start + offset + size].cast(typecode)
+        self.ids = self._sections["ids"]
+        self.latitude = self._sections["latitude"]
+        self.longitude = self._sections["longitude"]
+        self.feature_mask = self._sections["feature_mask"]
+        self.neighbour_count = self._sections["neighbour_count"]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def position(self, outlet_id: int) -> Optional[int]:
+        i = bisect_left(self.ids, outlet_id)
+        return i if i < self.count and self.ids[i] == outlet_id else None
+
+    def _string(self, column: str, i: int) -> Optional[str]:
+        if self._sections[f"{column}.null"][i]:
+            return None
+        offsets = self._sections[f"{column}.offsets"]
+        return str(self._sections[f"{column}.data"][offsets[i]:offsets[i + 1]], "utf-8")
+
+    def _ragged(self, name: str, i: int) -> memoryview:
+        offsets = self._sections[f"{name}.offsets"]
+        return self._sections[f"{name}.data"][offsets[i]:offsets[i + 1]]
+
+    def record(self, i: int) -> dict:
+        """The outlet at a position, in the same shape as outlet_cache.outlet_to_record"""
+        lat, lon = self.latitude[i], self.longitude[i]
+        return {
+            "id": self.ids[i],
+            "name": self._string("name", i),
+            "address": self._string("address", i),
+            "operating_hours": self._string("operating_hours", i),
+            "waze_link": self._string("waze_link", i),
+            "latitude": None if lat != lat else lat,
+            "longitude": None if lon != lon else lon,
+            "features": [self.features[f] for f in self._ragged("features", i)],
+            "neighbour_count": self.neighbour_count[i]
+        }
+
+    def hours(self, i: int) -> List[Tuple[int, int]]:
+        minutes = self._ragged("hours", i)
+        return [(minutes[k], minutes[k + 1]) for k in range(0, len(minutes), 2)]
+
+    def points(self) -> Iterator[Tuple[int, float, float]]:
+        """(id, latitude, longitude) of every geocoded outlet, for building the spatial index"""
+        ids, latitude, longitude = self.ids, self.latitude, self.longitude
+        for i in range(self.count):
+            lat, lon = latitude[i], longitude[i]
+            if lat == lat and lon == lon:
+                yield ids[i], lat, lon
+
+    def feature_ids(self, features: List[str], match: str = "any") -> List[int]:
+        """Ids of outlets with any/all of the features, in id order, from the bitmask column"""
+        bits = [1 << self.features.index(f) for f in set(features) if f in self.features]
+        if not bits or (match == "all" and len(bits) < len(set(features))):
+            return []
+        mask = sum(bits)
+        ids, masks = self.ids, self.feature_mask
+        if match == "all":
+            return [ids[i] for i in range(self.count) if masks[i] & mask == mask]
+        return [ids[i] for i in range(self.count) if masks[i] & mask]
+
+    def payload(self) -> EncodedPayload:
+        """The precomputed GET /outlets body, served straight from the mapping"""
+        return EncodedPayload.from_encoded(
+            self.version, self.etag, self._sections["payload.identity"], self._sections["payload.gzip"],
+            self._sections.get("payload.br")
+        )
+
+_mapped: Optional[MappedOutletSnapshot] = None
+_mapped_lock = threading.Lock()
+
+def get_mapped_snapshot(version: int, path: Optional[str] = None) -> Optional[MappedOutletSnapshot]:
+    """The mapped snapshot for a dataset version, remapping when the file was replaced.
+
+    Returns None when snapshots are disabled, missing or older than `version`, so callers fall back
+    to the database.
+    """
+    global _mapped
+    path = path or snapshot_path()
+    if not path:
+        return None
+    mapped = _mapped
+    if mapped is not None and mapped.version == version:
+        return mapped
+    with _mapped_lock:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if _mapped is None or _mapped.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            try:
+                # The previous mapping stays valid for records still referencing it and is freed with them
+                _mapped = MappedOutletSnapshot(path)
+                print(f"🗂️ Mapped outlet snapshot: {_mapped.count} outlets (dataset v{_mapped.version})")
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring outlet snapshot {path}: {e}")
+                _mapped = None
+                return None
+        return _mapped if _mapped.version == version else None
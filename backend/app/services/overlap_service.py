@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from ..repositories.outlet_repository import get_overlap_graph_version, get_overlap_edges, replace_overlap_edges
+from .dataset_version import current_dataset_version, expire_dataset_version
+from .spatial_index import SpatialIndex, get_spatial_index
+
+# Radius (metres) of the service circle drawn around each outlet on the map
+DEFAULT_OVERLAP_RADIUS_M = 5000
+# Radii whose graphs are persisted; any other radius is computed on demand and kept in memory only
+PERSISTED_RADII = (DEFAULT_OVERLAP_RADIUS_M,)
+MAX_CACHED_GRAPHS = 8
+
+class OverlapGraph:
+    """Neighbour graph of outlets whose circles of radius_m intersect (centres within 2 * radius_m)"""
+
+    def __init__(self, radius_m: int, version: int, edges: List[Tuple[int, int, float]]):
+        self.radius_m = radius_m
+        self.version = version
+        self.edges = edges
+        self.neighbour_counts: Dict[int, int] = {}
+        for a, b, _ in edges:
+            self.neighbour_counts[a] = self.neighbour_counts.get(a, 0) + 1
+            self.neighbour_counts[b] = self.neighbour_counts.get(b, 0) + 1
+
+    def to_dict(self) -> dict:
+        return {
+            "radius_m": self.radius_m,
+            "edges": [
+                {"outlet_id": a, "neighbour_id": b, "distance_m": round(d, 1)}
+                for a, b, d in self.edges
+            ],
+            "neighbour_counts": self.neighbour_counts
+        }
+
+def compute_overlap_edges(index: SpatialIndex, radius_m: int) -> List[Tuple[int, int, float]]:
+    """Index-based pair search: each outlet only compares against outlets in nearby grid cells"""
+    edges = []
+    for outlet_id, lat, lon in index.points():
+        for neighbour_id, distance in index.within_radius(lat, lon, 2 * radius_m):
+            if outlet_id < neighbour_id:
+                edges.append((outlet_id, neighbour_id, distance))
+    edges.sort()
+    return edges
+
+def rebuild_overlap_graph(db: Session, radius_m: int = DEFAULT_OVERLAP_RADIUS_M) -> OverlapGraph:
+    """Recompute and persist the overlap graph for the current outlets dataset"""
+    expire_dataset_version()
+    index = get_spatial_index(db)
+    edges = compute_overlap_edges(index, radius_m)
+    replace_overlap_edges(db, radius_m, edges, index.version)
+    db.commit()
+    print(f"🔗 Rebuilt overlap graph: {len(edges)} pairs within {radius_m}m circles (dataset v{index.version})")
+    graph = OverlapGraph(radius_m, index.version, edges)
+    _store(graph)
+    return graph
+
+_graphs: "OrderedDict[int, OverlapGraph]" = OrderedDict()
+_graphs_lock = threading.Lock()
+
+def _store(graph: OverlapGraph):
+    with _graphs_lock:
+        _graphs[graph.radius_m] = graph
+        _graphs.move_to_end(graph.radius_m)
+        while len(_graphs) > MAX_CACHED_GRAPHS:
+            _graphs.popitem(last=False)
+
+def get_overlap_graph(db: Session, radius_m: int = DEFAULT_OVERLAP_RADIUS_M) -> OverlapGraph:
+    """Return the overlap graph for the current dataset, loading or building it only when outlets change.
+
+    Read-only: a persisted graph older than the dataset is recomputed in memory, never written back;
+    only the writers (save_scrape_results, the geocoder) persist it via rebuild_overlap_graph.
+    """
+    version = current_dataset_version(db)
+    graph = _graphs.get(radius_m)
+    if graph is not None and graph.version == version:
+        return graph
+    if radius_m in PERSISTED_RADII and get_overlap_graph_version(db, radius_m) == version:
+        graph = OverlapGraph(radius_m, version, [tuple(e) for e in get_overlap_edges(db, radius_m)])
+        _store(graph)
+        return graph
+    index = get_spatial_index(db)
+    graph = OverlapGraph(radius_m, index.version, compute_overlap_edges(index, radius_m))
+    _store(graph)
+    return graph
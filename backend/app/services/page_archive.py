@@ -0,0 +1,121 @@
+"""On-disk archive of scraped result pages, so ingestion can be re-run without a browser or network.
+
+    <root>/<run>/manifest.json
+    <root>/<run>/<state>/page-0001.html.gz    inner markup of #results, exactly as it was fingerprinted
+
+Runs are named after their UTC start time, so sorting run names sorts captures chronologically. State
+directories are the URL-quoted state name. The manifest (which states were scraped completely, and
+whether the run covered every state) is written when the run finishes; a run without one replays
+as incomplete, so it can upsert outlets but never delete them.
+"""
+import gzip
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from urllib.parse import quote, unquote
+
+SCRAPER_ARCHIVE_DIR = os.getenv("SCRAPER_ARCHIVE_DIR")  # optional; unset archives nothing
+ARCHIVE_COMPRESSLEVEL = 6
+MANIFEST = "manifest.json"
+PAGE_SUFFIX = ".html.gz"
+
+class ArchivedPage(NamedTuple):
+    state: str
+    number: int
+    path: str
+
+class ArchivedRun(NamedTuple):
+    name: str
+    path: str
+    full_pass: bool
+    states: Dict[str, bool]  # state -> scraped completely
+    pages: List[ArchivedPage]  # by state, then page number
+
+def _page_path(run_dir: str, state: str, number: int) -> str:
+    return os.path.join(run_dir, quote(state, safe=""), f"page-{number:04d}{PAGE_SUFFIX}")
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+class PageArchive:
+    """Writes one scrape run's result pages; safe to share between the scraper's worker threads"""
+
+    def __init__(self, root: str):
+        self.started_at = datetime.now(timezone.utc)
+        self.name = f"{self.started_at.strftime('%Y%m%dT%H%M%SZ')}-{os.getpid()}"
+        self.path = os.path.join(root, self.name)
+        os.makedirs(self.path)
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.bytes = 0
+
+    def write_page(self, state: str, number: int, results_html: str) -> str:
+        path = _page_path(self.path, state, number)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # mtime=0 keeps the file bytes a function of the markup alone
+        data = gzip.compress(results_html.encode("utf-8"), compresslevel=ARCHIVE_COMPRESSLEVEL, mtime=0)
+        _write_atomic(path, data)
+        with self._lock:
+            self.pages += 1
+            self.bytes += len(data)
+        return path
+
+    def finish(self, states: Dict[str, bool], full_pass: bool = False):
+        """Record how the run ended; replay trusts completeness only from this manifest"""
+        manifest = {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "full_pass": full_pass,
+            "states": states
+        }
+        _write_atomic(os.path.join(self.path, MANIFEST), json.dumps(manifest, indent=2).encode("utf-8"))
+        print(f"🗄️ Archived {self.pages} pages ({self.bytes / 1024:.0f} KiB) to {self.path}")
+
+def read_page(path: str) -> str:
+    with open(path, "rb") as f:
+        return gzip.decompress(f.read()).decode("utf-8")
+
+def load_run(path: str) -> ArchivedRun:
+    manifest: Optional[dict] = None
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ {path} has no manifest (interrupted run?); replaying it as incomplete")
+    states = dict(manifest["states"]) if manifest else {}
+    pages = []
+    for entry in sorted(os.scandir(path), key=lambda e: e.name):
+        if not entry.is_dir():
+            continue
+        state = unquote(entry.name)
+        states.setdefault(state, False)
+        for page in sorted(os.listdir(entry.path)):
+            if page.startswith("page-") and page.endswith(PAGE_SUFFIX):
+                number = int(page[len("page-"):-len(PAGE_SUFFIX)])
+                pages.append(ArchivedPage(state, number, os.path.join(entry.path, page)))
+    return ArchivedRun(
+        os.path.basename(os.path.normpath(path)), path, bool(manifest and manifest.get("full_pass")), states, pages
+    )
+
+def _is_run(path: str) -> bool:
+    if os.path.exists(os.path.join(path, MANIFEST)):
+        return True
+    return any(
+        entry.is_dir() and any(name.endswith(PAGE_SUFFIX) for name in os.listdir(entry.path))
+        for entry in os.scandir(path)
+    )
+
+def list_runs(paths: Iterable[str]) -> List[ArchivedRun]:
+    """Runs named by paths (run directories or archive roots holding runs), oldest first"""
+    run_dirs = []
+    for path in paths:
+        if _is_run(path):
+            run_dirs.append(path)
+        else:
+            run_dirs.extend(entry.path for entry in os.scandir(path) if entry.is_dir())
+    return [load_run(path) for path in sorted(run_dirs, key=lambda p: os.path.basename(os.path.normpath(p)))]
@@ -0,0 +1,42 @@
+import gzip
+import hashlib
+from typing import Optional
+import orjson
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+class EncodedPayload:
+    """A JSON body serialized and compressed once, with a strong ETag derived from its bytes"""
+
+    def __init__(self, data, version: int):
+        self.body = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        self.version = version
+        digest = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        self.etag = f'"v{version}-{digest}"'
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.br_body: Optional[bytes] = brotli.compress(self.body, quality=11) if brotli else None
+
+    @classmethod
+    def from_encoded(cls, version: int, etag: str, body, gzip_body, br_body=None) -> "EncodedPayload":
+        """Wrap bodies encoded elsewhere (e.g. memoryviews of a mapped snapshot file)"""
+        payload = cls.__new__(cls)
+        payload.body = body
+        payload.version = version
+        payload.etag = etag
+        payload.gzip_body = gzip_body
+        payload.br_body = br_body
+        return payload
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding == "br" and self.br_body is not None:
+            return self.br_body
+        if encoding == "gzip":
+            return self.gzip_body
+        return self.body
+
+    @property
+    def encodings(self):
+        return ("br", "gzip") if self.br_body is not None else ("gzip",)
@@ -0,0 +1,171 @@
+import heapq
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..repositories.outlet_repository import get_outlet_coordinates
+from .dataset_version import current_dataset_version
+from .outlet_snapshot import get_mapped_snapshot
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+DEFAULT_CELL_DEGREES = 0.05  # ~5.5 km cells, roughly the map's 5 km outlet radius
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in metres between two coordinates"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+class SpatialIndex:
+    """Uniform lat/lon grid over outlet coordinates for radius, kNN and bbox lookups"""
+
+    def __init__(self, points: Iterable[Tuple[int, float, float]], cell_degrees: float = DEFAULT_CELL_DEGREES, version: int = 0):
+        self.cell_degrees = cell_degrees
+        self.version = version
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = {}
+        self.size = 0
+        min_i = min_j = max_i = max_j = 0
+        for outlet_id, lat, lon in points:
+            if lat is None or lon is None:
+                continue
+            key = self._cell(lat, lon)
+            self.cells.setdefault(key, []).append((outlet_id, lat, lon))
+            if self.size == 0:
+                min_i, min_j, max_i, max_j = key[0], key[1], key[0], key[1]
+            else:
+                min_i, max_i = min(min_i, key[0]), max(max_i, key[0])
+                min_j, max_j = min(min_j, key[1]), max(max_j, key[1])
+            self.size += 1
+        self.extent = (min_i, min_j, max_i, max_j)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def points(self):
+        """Iterate over every indexed (outlet_id, latitude, longitude)"""
+        for bucket in self.cells.values():
+            yield from bucket
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _ring(self, ci: int, cj: int, r: int):
+        """Yield the buckets on the square ring r cells away from (ci, cj)"""
+        if r == 0:
+            bucket = self.cells.get((ci, cj))
+            if bucket:
+                yield bucket
+            return
+        for i in range(ci - r, ci + r + 1):
+            for j in (cj - r, cj + r):
+                bucket = self.cells.get((i, j))
+                if bucket:
+                    yield bucket
+        for j in range(cj - r + 1, cj + r):
+            for i in (ci - r, ci + r):
+                bucket = self.cells.get((i, j))
+                if bucket:
+                    yield bucket
+
+    def _max_ring(self, ci: int, cj: int) -> int:
+        min_i, min_j, max_i, max_j = self.extent
+        return max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+
+    def _ring_min_distance(self, lat: float, r: int) -> float:
+        """Lower bound on the distance from the query point to any cell on ring r"""
+        if r <= 0:
+            return 0.0
+        edge_lat = min(89.9, abs(lat) + (r + 1) * self.cell_degrees)
+        cell_m = self.cell_degrees * METERS_PER_DEGREE_LAT * math.cos(math.radians(edge_lat))
+        return (r - 1) * cell_m
+
+    def within_radius(self, lat: float, lon: float, radius_m: float,
+                      predicate: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """Return (outlet_id, distance_m) within radius_m, nearest first"""
+        if not self.size:
+            return []
+        d_lat = radius_m / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(min(89.9, abs(lat) + d_lat))), 1e-6)
+        d_lon = radius_m / (METERS_PER_DEGREE_LAT * cos_lat)
+        min_i, min_j = self._cell(lat - d_lat, lon - d_lon)
+        max_i, max_j = self._cell(lat + d_lat, lon + d_lon)
+        results = []
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                for outlet_id, p_lat, p_lon in self.cells.get((i, j), ()):
+                    if predicate and not predicate(outlet_id):
+                        continue
+                    distance = haversine_m(lat, lon, p_lat, p_lon)
+                    if distance <= radius_m:
+                        results.append((outlet_id, distance))
+        results.sort(key=lambda item: item[1])
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int, radius_m: Optional[float] = None,
+                predicate: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """Return the k nearest (outlet_id, distance_m), optionally capped at radius_m"""
+        if not self.size or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lon)
+        max_ring = self._max_ring(ci, cj)
+        heap: List[Tuple[float, int]] = []  # max-heap of the best k via negated distances
+        r = 0
+        while r <= max_ring:
+            lower_bound = self._ring_min_distance(lat, r)
+            if radius_m is not None and lower_bound > radius_m:
+                break
+            if len(heap) == k and lower_bound > -heap[0][0]:
+                break
+            for bucket in self._ring(ci, cj, r):
+                for outlet_id, p_lat, p_lon in bucket:
+                    if predicate and not predicate(outlet_id):
+                        continue
+                    distance = haversine_m(lat, lon, p_lat, p_lon)
+                    if radius_m is not None and distance > radius_m:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, outlet_id))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, outlet_id))
+            r += 1
+        return sorted(((outlet_id, -neg) for neg, outlet_id in heap), key=lambda item: item[1])
+
+    def within_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[int]:
+        """Return outlet ids inside the bounding box, ordered by id"""
+        if not self.size:
+            return []
+        min_i, min_j = self._cell(min_lat, min_lon)
+        max_i, max_j = self._cell(max_lat, max_lon)
+        ids = []
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(self.cells):
+            buckets = (b for key, b in self.cells.items() if min_i <= key[0] <= max_i and min_j <= key[1] <= max_j)
+        else:
+            buckets = (self.cells[(i, j)] for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1) if (i, j) in self.cells)
+        for bucket in buckets:
+            for outlet_id, lat, lon in bucket:
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    ids.append(outlet_id)
+        ids.sort()
+        return ids
+
+_index: Optional[SpatialIndex] = None
+_index_lock = threading.Lock()
+
+def get_spatial_index(db: Session) -> SpatialIndex:
+    """Return the process-wide index, rebuilding it when the outlet dataset version changes"""
+    global _index
+    version = current_dataset_version(db)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            mapped = get_mapped_snapshot(version)
+            points = mapped.points() if mapped is not None else get_outlet_coordinates(db)
+            _index = SpatialIndex(points, version=version)
+            print(f"🗺️ Built spatial index: {len(_index)} outlets (dataset v{version})")
+        return _index
@@ -0,0 +1,147 @@
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from .dataset_version import current_dataset_version
+from .outlet_cache import outlet_cache
+
+# Name tokens count for more than address tokens when ranking
+NAME_WEIGHT = 2.0
+ADDRESS_WEIGHT = 1.0
+# Fuzzy matches need this trigram (Dice) similarity, or an edit distance of 1 (2 for long terms)
+MIN_TRIGRAM_SIMILARITY = 0.5
+MIN_FUZZY_LENGTH = 4
+MAX_TERM_MATCHES = 1024
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free alphanumeric tokens"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.findall(r"[a-z0-9]+", text)
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (transpositions count as one edit), giving up past limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+class TextIndex:
+    """In-memory inverted index over outlet names and addresses with typo-tolerant term lookup.
+
+    Each token maps to the outlets containing it (weighted by field), and each token's trigrams map
+    back to the vocabulary, so a misspelled term is resolved to nearby tokens without a table scan.
+    """
+
+    def __init__(self, records: Iterable[dict], version: int = 0):
+        self.version = version
+        self.postings: Dict[str, Dict[int, float]] = {}
+        size = 0
+        for record in records:
+            size += 1
+            for field, weight in (("address", ADDRESS_WEIGHT), ("name", NAME_WEIGHT)):
+                for token in tokenize(record.get(field)):
+                    postings = self.postings.setdefault(token, {})
+                    postings[record["id"]] = max(postings.get(record["id"], 0.0), weight)
+        self.size = size
+        self.trigram_tokens: Dict[str, List[str]] = {}
+        for token in self.postings:
+            for gram in trigrams(token):
+                self.trigram_tokens.setdefault(gram, []).append(token)
+        self._term_matches: Dict[Tuple[str, bool], List[Tuple[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def document_frequency(self, token: str) -> int:
+        """Number of outlets whose name or address contains the token"""
+        return len(self.postings.get(token, ()))
+
+    def idf(self, token: str) -> float:
+        return math.log(1 + self.size / len(self.postings[token]))
+
+    def match_term(self, term: str, fuzzy: bool = True) -> List[Tuple[str, float]]:
+        """Vocabulary tokens matching a term, with a similarity in (0, 1]; exact matches score 1"""
+        key = (term, fuzzy)
+        matches = self._term_matches.get(key)
+        if matches is not None:
+            return matches
+        matches = [(term, 1.0)] if term in self.postings else []
+        if fuzzy and len(term) >= MIN_FUZZY_LENGTH and not term.isdigit():
+            grams = trigrams(term)
+            shared: Dict[str, int] = {}
+            for gram in grams:
+                for token in self.trigram_tokens.get(gram, ()):
+                    shared[token] = shared.get(token, 0) + 1
+            limit = 2 if len(term) >= 8 else 1
+            for token, count in shared.items():
+                if token == term or token.isdigit():
+                    continue
+                similarity = 2 * count / (len(grams) + len(token))
+                distance = edit_distance(term, token, limit)
+                if distance <= limit:
+                    similarity = max(similarity, 1 - distance / max(len(term), len(token)))
+                elif similarity < MIN_TRIGRAM_SIMILARITY:
+                    continue
+                # A fuzzy match never outranks an exact one
+                matches.append((token, min(similarity, 0.95)))
+        with self._lock:
+            if len(self._term_matches) >= MAX_TERM_MATCHES:
+                self._term_matches.clear()
+            self._term_matches[key] = matches
+        return matches
+
+    def search(self, terms: List[str], fuzzy: bool = True, exact: Iterable[str] = ()) -> List[Tuple[int, float]]:
+        """Outlets matching every term, best first, as (outlet_id, score); terms in `exact` never match fuzzily"""
+        exact = set(exact)
+        scores: Optional[Dict[int, float]] = None
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            for token, similarity in self.match_term(term, fuzzy and term not in exact):
+                weight = similarity * self.idf(token)
+                for outlet_id, field_weight in self.postings[token].items():
+                    score = weight * field_weight
+                    if score > term_scores.get(outlet_id, 0.0):
+                        term_scores[outlet_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+            if not scores:
+                return []
+        return sorted((scores or {}).items(), key=lambda item: (-item[1], item[0]))
+
+_index: Optional[TextIndex] = None
+_index_lock = threading.Lock()
+
+def get_text_index(db: Session) -> TextIndex:
+    """Return the process-wide name/address index, rebuilding it when the outlet dataset version changes"""
+    global _index
+    version = current_dataset_version(db)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = TextIndex(outlet_cache.all(db), version=version)
+            print(f"🔤 Built text index: {len(_index)} outlets, {len(_index.postings)} terms (dataset v{version})")
+        return _index
@@ -0,0 +1,41 @@
+import os
+import time
+from typing import Callable, Dict
+from sqlalchemy.orm import Session
+from .chatbot_service import get_genai_client
+from .cluster_service import get_cluster_index
+from ..opening_hours import minute_of_week
+from .outlet_cache import outlet_cache
+from .overlap_service import get_overlap_graph
+from .spatial_index import get_spatial_index
+from .text_index import get_text_index
+
+def warm_up(db: Session) -> Dict[str, float]:
+    """Load everything the first requests would otherwise build on demand; returns milliseconds per step.
+
+    A failing step is reported and skipped, so an unavailable database or LLM never blocks startup.
+    """
+    steps: Dict[str, Callable[[], object]] = {
+        "outlets": lambda: outlet_cache.all_encoded(db),
+        "spatial_index": lambda: get_spatial_index(db),
+        "overlap_graph": lambda: get_overlap_graph(db),
+        "clusters": lambda: get_cluster_index(db),
+        "text_index": lambda: get_text_index(db),
+        "open_now": lambda: outlet_cache.open_ids(db, minute_of_week())
+    }
+    api_key = os.getenv("GEMINI_API_KEY")
+    if api_key:
+        steps["llm_client"] = lambda: get_genai_client(api_key)
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️ Warm-up step {name} failed: {e.__class__.__name__}: {e}")
+            # A failed query leaves the shared session's transaction aborted; the next step needs a clean one
+            db.rollback()
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    print(f"🔥 Warm-up done in {sum(timings.values()):.0f}ms: " + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items()))
+    return timings
@@ -0,0 +1 @@
+"""Reproducible benchmarks for the API hot paths; run with `python -m benchmarks.run` from backend/"""
@@ -0,0 +1,60 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+
+Exits with status 1 when any p50/p95 latency grows (or throughput drops) by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_METRICS = ("p50_ms", "p95_ms")
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+def compare(baseline: dict, candidate: dict, threshold: float = 0.1) -> list:
+    """Rows of (scale, benchmark, metric, before, after, relative change, regressed)"""
+    rows = []
+    for scale, base_result in baseline.get("scales", {}).items():
+        cand_result = candidate.get("scales", {}).get(scale)
+        if not cand_result:
+            continue
+        for group in ("http", "micro", "startup"):
+            for name, before in base_result.get(group, {}).items():
+                after = cand_result.get(group, {}).get(name)
+                if not after:
+                    continue
+                for metric in LATENCY_METRICS:
+                    change = _change(before[metric], after[metric])
+                    rows.append((scale, name, metric, before[metric], after[metric], change, change > threshold))
+                if "throughput_rps" in before:
+                    change = _change(before["throughput_rps"], after["throughput_rps"])
+                    rows.append((scale, name, "throughput_rps", before["throughput_rps"], after["throughput_rps"],
+                                 change, change < -threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results between two runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"{baseline.get('revision')} -> {candidate.get('revision')}")
+    regressions = 0
+    for scale, name, metric, before, after, change, regressed in compare(baseline, candidate, args.threshold):
+        marker = "❌" if regressed else "  "
+        regressions += regressed
+        print(f"{marker} [{scale}] {name} {metric}: {before} -> {after} ({change:+.1%})")
+    if regressions:
+        print(f"⚠️ {regressions} regressions above {args.threshold:.0%}")
+        sys.exit(1)
+    print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import math
+import time
+from typing import Callable, List
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples: List[float], elapsed: float = None) -> dict:
+    """Latency statistics in milliseconds for samples given in seconds"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    total = sum(ordered)
+    elapsed = total if elapsed is None else elapsed
+    return {
+        "count": count,
+        "mean_ms": round(total / count * 1000, 4) if count else 0.0,
+        "min_ms": round(ordered[0] * 1000, 4) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+        "ops_per_sec": round(count / elapsed, 2) if elapsed else 0.0
+    }
+
+def measure(fn: Callable[[], object], iterations: int = 50, warmup: int = 2, max_seconds: float = 10.0,
+            min_iterations: int = 3) -> dict:
+    """Time repeated calls of fn; stops early once max_seconds is spent (after min_iterations)"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if i + 1 >= min_iterations and time.perf_counter() - started >= max_seconds:
+            break
+    return summarize(samples, time.perf_counter() - started)
@@ -0,0 +1,102 @@
+"""Result-page parsing and archive replay throughput, without a browser, network or database.
+
+    python -m benchmarks.parser --pages 500 --per-page 20 --workers 1,4
+    python -m benchmarks.parser --archive archive/        # real captures instead of synthetic pages
+
+Synthetic pages are built from the seeded outlet generator in the locator's addressBox markup and
+written to a temporary archive, so replay reads, decompresses and parses exactly what a scrape
+would have archived.
+"""
+import argparse
+import html
+import json
+import tempfile
+import time
+from typing import List
+from .harness import measure
+from .seed import synthetic_outlets
+
+def address_box(record: dict) -> str:
+    """One outlet as the locator renders it: JSON-LD plus a tooltip per feature"""
+    data = {
+        "@context": "https://schema.org", "@type": "Restaurant",
+        "name": record["name"], "address": record["address"],
+        "geo": {"@type": "GeoCoordinates", "latitude": record["latitude"], "longitude": record["longitude"]}
+    }
+    features = "".join(
+        f'<div class="ed-tooltip"><img src="/icons/{i}.png"><span class="ed-tooltiptext">{html.escape(f)}</span></div>'
+        for i, f in enumerate(json.loads(record["features"]))
+    )
+    return (f'<div class="addressBox"><script type="application/ld+json">{json.dumps(data)}</script>'
+            f'<h3 class="addressTitle">{html.escape(record["name"])}</h3>'
+            f'<p class="addressText">{html.escape(record["address"])}</p>'
+            f'<div class="addressTop">{features}</div></div>')
+
+def synthetic_pages(pages: int, per_page: int, seed: int = 42) -> List[str]:
+    records = list(synthetic_outlets(pages * per_page, seed))
+    return ["".join(address_box(r) for r in records[i:i + per_page]) for i in range(0, len(records), per_page)]
+
+def parser_cases(page: str, iterations: int, max_seconds: float) -> dict:
+    """Parse time of one result page with each available BeautifulSoup tree builder"""
+    import app.services.outlet_parser as outlet_parser
+    results = {}
+    default = outlet_parser.HTML_PARSER
+    try:
+        for builder in ("html.parser", "lxml"):
+            try:
+                outlet_parser.HTML_PARSER = builder
+                outlet_parser.parse_results_list(page)
+            except Exception as e:  # bs4.FeatureNotFound when lxml is missing
+                print(f"  parse.{builder}: unavailable ({e.__class__.__name__})")
+                continue
+            results[f"parse.{builder}"] = measure(lambda: outlet_parser.parse_results_list(page), iterations, max_seconds=max_seconds)
+            print(f"  parse.{builder}: p50={results[f'parse.{builder}']['p50_ms']}ms per page")
+    finally:
+        outlet_parser.HTML_PARSER = default
+    return results
+
+def replay_cases(runs, workers: List[int]) -> dict:
+    from app.replay import replay_runs
+    pages = sum(len(run.pages) for run in runs)
+    results = {}
+    for count in workers:
+        started = time.perf_counter()
+        replay_runs(None, runs, count)
+        elapsed = time.perf_counter() - started
+        results[f"replay.workers={count}"] = {"pages": pages, "seconds": round(elapsed, 3),
+                                               "pages_per_sec": round(pages / elapsed, 1) if elapsed else 0.0}
+    return results
+
+def main():
+    from app.services.page_archive import PageArchive, list_runs
+    parser = argparse.ArgumentParser(description="Benchmark result-page parsing and archive replay")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--workers", default="1,4", help="Comma-separated replay pool sizes")
+    parser.add_argument("--archive", help="Replay these archived runs instead of synthetic pages")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--max-seconds", type=float, default=10.0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if args.archive:
+        runs = list_runs([args.archive])
+    else:
+        archive = PageArchive(tempfile.mkdtemp(prefix="mcd-archive-"))
+        for number, page in enumerate(synthetic_pages(args.pages, args.per_page), 1):
+            archive.write_page("Kuala Lumpur", number, page)
+        archive.finish({"Kuala Lumpur": True})
+        runs = list_runs([archive.path])
+    from app.services.page_archive import read_page
+    sample = read_page(runs[0].pages[0].path)
+    print("⏱️  Single page parse")
+    results = parser_cases(sample, args.iterations, args.max_seconds)
+    print("⏱️  Archive replay (parse only)")
+    results.update(replay_cases(runs, [int(w) for w in args.workers.split(",")]))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
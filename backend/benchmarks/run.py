@@ -0,0 +1,128 @@
+"""Seed SQLite databases at several scales and benchmark the API against each.
+
+    python -m benchmarks.run --scales 100,10000 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+
+Each scale runs in its own interpreter because the engine and caches are process-wide. Import time
+and cold start are measured per scale too (see benchmarks.startup), each sample in a fresh interpreter.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SCALES = "100,10000,100000"
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_scale(args) -> dict:
+    """Worker entry point: seed one database and run every benchmark against it"""
+    # Configure the app before anything imports app.database
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ.setdefault("OUTLET_CACHE_TTL", "60")
+    from app.database import SessionLocal
+    from app.migrations import run_migrations
+    from app.models.outlet import Outlet
+    from .scenarios import http_benchmarks, micro_benchmarks, stub_llm
+    from .seed import seed_outlets
+    from .startup import startup_benchmarks
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+    run_migrations()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        seed_outlets(db, args.scale, args.seed)
+        seed_seconds = round(time.perf_counter() - started, 3)
+        print(f"🌱 Seeded {args.scale} outlets in {seed_seconds}s")
+        outlet_ids = [outlet_id for (outlet_id,) in db.query(Outlet.id).order_by(Outlet.id)]
+        stub_llm(args.llm_latency)
+        print("⏱️  Micro-benchmarks")
+        micro = micro_benchmarks(db, args.iterations, args.max_seconds)
+    finally:
+        db.close()
+    print("⏱️  HTTP benchmarks")
+    http = http_benchmarks(outlet_ids, args.requests, args.concurrency, args.seed)
+    result = {"scale": args.scale, "seed_seconds": seed_seconds, "http": http, "micro": micro}
+    if args.startup_repeat:
+        print("⏱️  Import and cold start")
+        startup = startup_benchmarks(args.db, args.startup_repeat)
+        result["startup"], result["startup_info"] = startup["results"], startup["info"]
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the outlet locator API on synthetic SQLite data")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated outlet counts to seed")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent in-flight HTTP requests")
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations per micro-benchmark")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Time budget per micro-benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the stubbed LLM call sleeps")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-repeat", type=int, default=3, help="Fresh interpreters per cold-start probe (0 to skip)")
+    parser.add_argument("--db-dir", help="Where to create the SQLite files (default: a temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    # Internal: run a single scale in this process
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scale is not None:
+        result = run_scale(args)
+        with open(args.result, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="mcd-bench-")
+    os.makedirs(db_dir, exist_ok=True)
+    report = {
+        "revision": _git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "requests": args.requests, "concurrency": args.concurrency, "iterations": args.iterations,
+            "llm_latency": args.llm_latency, "seed": args.seed, "startup_repeat": args.startup_repeat
+        },
+        "scales": {}
+    }
+    for scale in scales:
+        print(f"📊 Benchmarking {scale} outlets", file=sys.stderr)
+        result_path = os.path.join(db_dir, f"result-{scale}.json")
+        command = [
+            sys.executable, "-m", "benchmarks.run", "--scale", str(scale),
+            "--db", os.path.join(db_dir, f"bench-{scale}.db"), "--result", result_path,
+            "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+            "--iterations", str(args.iterations), "--max-seconds", str(args.max_seconds),
+            "--llm-latency", str(args.llm_latency), "--seed", str(args.seed),
+            "--startup-repeat", str(args.startup_repeat)
+        ]
+        # Worker progress goes to stderr so stdout stays valid JSON
+        subprocess.run(command, check=True, stdout=sys.stderr, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with open(result_path, encoding="utf-8") as f:
+            report["scales"][str(scale)] = json.load(f)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
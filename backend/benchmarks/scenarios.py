@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+from .harness import measure, summarize
+from .serialization import run_cases, serialization_cases
+
+CHATBOT_QUERIES = [
+    "Which outlets are open 24 hours?",
+    "outlets with drive thru",
+    "Where can I get breakfast and coffee?",
+    "birthday party venue",
+    "dessert center near me",
+    "digital kiosk and cashless payment",
+    "mcdelivery",
+    "free wifi",
+    "Drive-Thru with McCafe",
+    "open late for dessert"
+]
+
+def stub_llm(latency: float):
+    """Replace the Gemini call with a keyword matcher that sleeps `latency` seconds, so the
+    chatbot path (cache, worker pool, coalescing) is exercised without network access"""
+    import os
+    from app.services import chatbot_service
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+    def fake_call(api_key: str, query: str) -> Optional[List[str]]:
+        if latency:
+            time.sleep(latency)
+        return chatbot_service.extract_features_simple(query)
+
+    chatbot_service._call_gemini = fake_call
+
+async def _load(client, make_request: Callable[[int], dict], requests: int, concurrency: int) -> dict:
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            t0 = time.perf_counter()
+            response = await client.request(**make_request(i))
+            await response.aread()
+            samples.append(time.perf_counter() - t0)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result = summarize(samples, time.perf_counter() - started)
+    result["throughput_rps"] = result.pop("ops_per_sec")
+    result["status_codes"] = statuses
+    return result
+
+async def _http_benchmarks(app, outlet_ids: List[int], requests: int, concurrency: int, seed: int) -> dict:
+    import httpx
+    rng = random.Random(seed)
+    scenarios = {
+        "GET /outlets": lambda i: {"method": "GET", "url": "/outlets"},
+        "GET /outlets?limit=100": lambda i: {"method": "GET", "url": "/outlets", "params": {"limit": 100, "after": outlet_ids[i % len(outlet_ids)]}},
+        "GET /outlets/{id}": lambda i: {"method": "GET", "url": f"/outlets/{rng.choice(outlet_ids)}"},
+        "POST /chatbot": lambda i: {"method": "POST", "url": "/chatbot", "json": {"query": CHATBOT_QUERIES[i % len(CHATBOT_QUERIES)]}},
+        "POST /chatbot (located)": lambda i: {"method": "POST", "url": "/chatbot", "json": {
+            "query": CHATBOT_QUERIES[i % len(CHATBOT_QUERIES)], "latitude": 3.139, "longitude": 101.6869
+        }}
+    }
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        for name, make_request in scenarios.items():
+            # The first request pays for cold caches (outlet snapshot, payload encoding, indexes)
+            t0 = time.perf_counter()
+            response = await client.request(**make_request(0))
+            await response.aread()
+            cold_ms = round((time.perf_counter() - t0) * 1000, 4)
+            results[name] = await _load(client, make_request, requests, concurrency)
+            results[name]["first_request_ms"] = cold_ms
+            print(f"  {name}: p50={results[name]['p50_ms']}ms p99={results[name]['p99_ms']}ms "
+                  f"{results[name]['throughput_rps']} req/s")
+    return results
+
+def http_benchmarks(outlet_ids: List[int], requests: int = 200, concurrency: int = 8, seed: int = 42) -> dict:
+    """Latency percentiles and throughput of the API endpoints, driven in-process over ASGI"""
+    from app.api import app
+    return asyncio.run(_http_benchmarks(app, outlet_ids, requests, concurrency, seed))
+
+def micro_benchmarks(db: Session, iterations: int = 50, max_seconds: float = 10.0) -> dict:
+    """Repository and service-level timings that do not go through HTTP"""
+    from app.repositories.outlet_repository import get_all_outlets, get_outlets_by_features
+    from app.services.outlet_cache import outlet_to_record
+    from app.services.outlet_service import find_outlets_by_features, list_outlets, search_outlets
+    from app.services.payload import EncodedPayload
+
+    outlets = get_all_outlets(db)
+    records = [outlet_to_record(o) for o in outlets]
+    cases = {
+        "repository.get_outlets_by_features[any]": lambda: get_outlets_by_features(db, ["WiFi", "McCafe"], "any"),
+        "repository.get_outlets_by_features[all]": lambda: get_outlets_by_features(db, ["WiFi", "McCafe"], "all"),
+        "service.find_outlets_by_features[cached]": lambda: find_outlets_by_features(db, ["WiFi", "McCafe"], "any"),
+        "service.list_outlets[cached]": lambda: list_outlets(db),
+        "service.search_outlets[k=10]": lambda: search_outlets(db, ["Drive-Thru"], "any", 3.139, 101.6869, None, 10)
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, iterations=iterations, max_seconds=max_seconds)
+        print(f"  {name}: p50={results[name]['p50_ms']}ms")
+    serialization = {
+        "serialize.outlet_to_record": lambda: [outlet_to_record(o) for o in outlets],
+        "serialize.encoded_payload": lambda: EncodedPayload(records, 0).encoded("gzip")
+    }
+    serialization.update(serialization_cases(records))
+    results.update(run_cases(serialization, len(outlets), iterations, max_seconds))
+    return results
@@ -0,0 +1,54 @@
+import json
+import random
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models.outlet import Outlet
+from app.repositories.outlet_repository import bump_dataset_version, outlet_content_hash
+from app.services.chatbot_service import KNOWN_FEATURES
+
+# Roughly the extent of Peninsular Malaysia and Borneo; points are spread uniformly so density
+# (and therefore overlap-graph size) grows linearly with the outlet count
+MIN_LAT, MAX_LAT = 1.2, 6.7
+MIN_LON, MAX_LON = 99.6, 119.3
+TOWNS = ["Kuala Lumpur", "Petaling Jaya", "Shah Alam", "Johor Bahru", "Ipoh", "George Town", "Kuching", "Kota Kinabalu", "Melaka", "Seremban"]
+STREETS = ["Jalan Bukit Bintang", "Jalan Ampang", "Jalan Tun Razak", "Jalan Sultan Ismail", "Persiaran Gurney", "Jalan Tebrau"]
+HOURS = ["24 Hours", "6am - 2am", "07:00 - 23:00", "7am - 11pm", "Closed for renovation"]
+INSERT_CHUNK_SIZE = 5000
+
+def synthetic_outlets(count: int, seed: int = 42):
+    """Deterministic outlet records shaped like scraper output"""
+    rng = random.Random(seed)
+    for i in range(count):
+        town = TOWNS[i % len(TOWNS)]
+        record = {
+            "name": f"McDonald's {town} {i}",
+            "address": f"{rng.randint(1, 400)}, {rng.choice(STREETS)}, {i:06d} {town}, Malaysia",
+            "operating_hours": rng.choice(HOURS),
+            "waze_link": f"https://waze.com/ul?ll={i}",
+            # A few outlets are not geocoded yet, as in production
+            "latitude": rng.uniform(MIN_LAT, MAX_LAT) if i % 50 else None,
+            "longitude": rng.uniform(MIN_LON, MAX_LON) if i % 50 else None,
+            "features": json.dumps(rng.sample(KNOWN_FEATURES, rng.randint(1, 6)))
+        }
+        record["content_hash"] = outlet_content_hash(record)
+        yield record
+
+def seed_outlets(db: Session, count: int, seed: int = 42) -> int:
+    """Insert `count` synthetic outlets and derive the indexed tables exactly as a scrape would"""
+    from app.migrations import migrate_outlet_features, migrate_outlet_hours
+    from app.services.overlap_service import rebuild_overlap_graph
+    chunk = []
+    for record in synthetic_outlets(count, seed):
+        chunk.append(record)
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            db.execute(insert(Outlet), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(Outlet), chunk)
+    db.commit()
+    migrate_outlet_features(db, force=True)
+    migrate_outlet_hours(db, force=True)
+    bump_dataset_version(db)
+    db.commit()
+    rebuild_overlap_graph(db)
+    return count
@@ -0,0 +1,65 @@
+"""Serialization cost of outlet responses, per 1k outlets, for each way FastAPI could encode them.
+
+    python -m benchmarks.serialization --count 10000
+
+No database is needed: records come from the same synthetic generator the seeded benchmarks use.
+"""
+import argparse
+import json
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+from .harness import measure
+
+def serialization_cases(records: List[dict]) -> Dict[str, Callable[[], object]]:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from pydantic import TypeAdapter
+    from app.schemas.outlet import OutletResponse
+    adapter = TypeAdapter(List[OutletResponse])
+
+    def response_model_path():
+        # What FastAPI does for a returned list when response_model is set: validate, dump, then render
+        validated = adapter.validate_python(records)
+        return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+    return {
+        # Before: a plain dict/list return goes through jsonable_encoder and json.dumps
+        "serialize.jsonable_encoder+json": lambda: JSONResponse(jsonable_encoder(records)).body,
+        "serialize.response_model+json": response_model_path,
+        # After: ORJSONResponse returned directly
+        "serialize.orjson": lambda: ORJSONResponse(records).body
+    }
+
+def run_cases(cases: Dict[str, Callable[[], object]], count: int, iterations: int, max_seconds: float) -> dict:
+    per_1k = max(count, 1) / 1000
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, iterations=iterations, max_seconds=max_seconds)
+        results[name]["per_1k_outlets_ms"] = round(results[name]["mean_ms"] / per_1k, 4)
+        print(f"  {name}: {results[name]['per_1k_outlets_ms']}ms per 1k outlets")
+    return results
+
+def main():
+    from app.services.outlet_cache import outlet_to_record
+    from .seed import synthetic_outlets
+    parser = argparse.ArgumentParser(description="Benchmark outlet serialization per 1k outlets")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--max-seconds", type=float, default=10.0)
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    rows = [SimpleNamespace(id=i + 1, **record) for i, record in enumerate(synthetic_outlets(args.count))]
+    records = [outlet_to_record(row) for row in rows]
+    cases = {"serialize.outlet_to_record": lambda: [outlet_to_record(row) for row in rows]}
+    cases.update(serialization_cases(records))
+    results = run_cases(cases, args.count, args.iterations, args.max_seconds)
+    before = results["serialize.jsonable_encoder+json"]["per_1k_outlets_ms"]
+    after = results["serialize.orjson"]["per_1k_outlets_ms"]
+    print(f"✅ orjson is {before / after:.1f}x faster than jsonable_encoder+json" if after else "")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"count": args.count, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Import time and cold-start latency of the API, every sample in a fresh interpreter.
+
+    python -m benchmarks.startup --count 10000 --repeat 5 --output startup.json
+    python -m benchmarks.startup --db existing.db
+
+Probes:
+    import        `import app.api` alone (what a worker pays before it can even bind a socket)
+    warm          import, lifespan startup with warm-up, then the first GET /outlets and POST /chatbot
+    lazy          the same with APP_WARMUP=0: a faster startup, paid for by the first requests
+
+`process` is the wall time of the whole child, interpreter start-up included.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from .harness import summarize
+
+PROBES = ("import", "warm", "lazy")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _probe(kind: str, db_path: str) -> dict:
+    """Child entry point: measure one cold start in this (fresh) interpreter"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["APP_WARMUP"] = "0" if kind == "lazy" else "1"
+    # Keyword matching only: no network, and no LLM client to import. Set rather than removed, since
+    # load_dotenv (on `import app`) would fill a missing key back in from app/.env
+    os.environ["GEMINI_API_KEY"] = ""
+    timings = {}
+    started = time.perf_counter()
+    from app.api import app
+    timings["import"] = time.perf_counter() - started
+    from app.database import engine_created
+    info = {
+        "modules": len(sys.modules),
+        "engine_created": engine_created(),
+        "genai_imported": "google.genai" in sys.modules
+    }
+    if kind == "import":
+        return {"timings": timings, "info": info}
+
+    async def serve():
+        import httpx
+        t0 = time.perf_counter()
+        async with app.router.lifespan_context(app):
+            timings["startup"] = time.perf_counter() - t0
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                for name, request in (
+                    ("first GET /outlets", {"method": "GET", "url": "/outlets"}),
+                    ("first POST /chatbot", {"method": "POST", "url": "/chatbot", "json": {"query": "drive thru near Ampang"}})
+                ):
+                    t0 = time.perf_counter()
+                    response = await client.request(**request)
+                    await response.aread()
+                    timings[name] = time.perf_counter() - t0
+        timings["ready"] = timings["import"] + timings["startup"]
+
+    asyncio.run(serve())
+    return {"timings": timings, "info": info}
+
+def startup_benchmarks(db_path: str, repeat: int = 3) -> dict:
+    """Run every probe `repeat` times against an existing (migrated, seeded) SQLite database"""
+    samples: Dict[str, List[float]] = {}
+    info = {}
+    for _ in range(repeat):
+        for kind in PROBES:
+            started = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.startup", "--probe", kind, "--db", db_path],
+                capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+            )
+            process = time.perf_counter() - started
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            samples.setdefault(f"{kind}: process", []).append(process)
+            for name, seconds in result["timings"].items():
+                samples.setdefault(f"{kind}: {name}", []).append(seconds)
+            info[kind] = result["info"]
+    results = {name: summarize(values) for name, values in samples.items()}
+    for name, result in results.items():
+        print(f"  {name}: p50={result['p50_ms']}ms")
+    return {"results": results, "info": info}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API import time and cold start")
+    parser.add_argument("--db", help="Existing SQLite database (default: seed a temporary one)")
+    parser.add_argument("--count", type=int, default=10000, help="Outlets to seed when --db is not given")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per probe")
+    parser.add_argument("--output", help="Write results JSON here")
+    # Internal: run one probe in this process and print its JSON
+    parser.add_argument("--probe", choices=PROBES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(_probe(args.probe, args.db)))
+        return
+
+    db_path = args.db
+    if not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="mcd-startup-"), "startup.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app.database import SessionLocal
+        from app.migrations import run_migrations
+        from .seed import seed_outlets
+        run_migrations()
+        db = SessionLocal()
+        try:
+            seed_outlets(db, args.count)
+        finally:
+            db.close()
+        print(f"🌱 Seeded {args.count} outlets into {db_path}")
+    report = startup_benchmarks(db_path, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
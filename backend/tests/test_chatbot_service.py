@@ -0,0 +1,32 @@
+import pytest
+from app.services import chatbot_service
+from app.services.text_index import TextIndex
+
+TOWNS = ["Cheras", "Kepong", "Setapak", "Sentul", "Wangsa Maju"]
+
+@pytest.fixture
+def index(monkeypatch):
+    records = [
+        {"id": i, "name": f"McDonald's {TOWNS[i % len(TOWNS)]} {i}",
+         "address": f"{i}, Jalan {TOWNS[i % len(TOWNS)]}, Kuala Lumpur"}
+        for i in range(1, 200)
+    ]
+    records.append({"id": 200, "name": "McDonald's Ampang Point", "address": "Jalan Ampang, Kuala Lumpur"})
+    text_index = TextIndex(records)
+    monkeypatch.setattr(chatbot_service, "get_text_index", lambda db: text_index)
+    return text_index
+
+def test_common_address_token_is_not_a_place(index):
+    # "jalan" and "kuala" are in every address: without a cue they must not filter outlets
+    terms, exact, remainder = chatbot_service.extract_place_terms(None, "jalan kuala wifi")
+    assert terms == [] and exact == []
+    assert remainder
+
+def test_rare_token_is_a_place_without_cue(index):
+    terms, exact, remainder = chatbot_service.extract_place_terms(None, "ampang drive thru")
+    assert terms == ["ampang"] and exact == ["ampang"]
+    assert remainder
+
+def test_cued_terms_are_kept_and_may_be_misspelled(index):
+    terms, exact, _ = chatbot_service.extract_place_terms(None, "near jalan ampnag")
+    assert terms == ["jalan", "ampnag"] and exact == []
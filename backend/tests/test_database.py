@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.database import async_database_url, create_async_db_engine
+
+pytest.importorskip("aiosqlite")
+
+def test_async_database_url_maps_drivers():
+    assert async_database_url("sqlite:///outlets.db") == "sqlite+aiosqlite:///outlets.db"
+    assert async_database_url("postgresql://u:p@db/outlets") == "postgresql+asyncpg://u:p@db/outlets"
+
+def test_async_engine_against_sqlite(tmp_path):
+    async def run():
+        engine = create_async_db_engine(f"sqlite:///{tmp_path / 'async.db'}")
+        try:
+            async with engine.connect() as conn:
+                assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+                # The sync engine's SQLite pragmas apply to async connections too
+                assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useMemo } from "react";
 import { MapContainer, TileLayer, Marker, Circle, Popup } from "react-leaflet";
 import L from "leaflet";
 import "leaflet/dist/leaflet.css";
@@ -36,25 +36,16 @@ export type Outlet = {
   latitude: number;
   longitude: number;
   features: string[];
+  neighbour_count?: number;
 };
 
-function haversineDistance(a: Outlet, b: Outlet): number {
-  const toRad = (x: number) => (x * Math.PI) / 180;
-  const R = 6371000;
-  const dLat = toRad(b.latitude - a.latitude);
-  const dLon = toRad(b.longitude - a.longitude);
-  const lat1 = toRad(a.latitude);
-  const lat2 = toRad(b.latitude);
-  const c =
-    Math.sin(dLat / 2) * Math.sin(dLat / 2) +
-    Math.cos(lat1) * Math.cos(lat2) * Math.sin(dLon / 2) * Math.sin(dLon / 2);
-  return R * 2 * Math.atan2(Math.sqrt(c), Math.sqrt(1 - c));
-}
+export type OutletOverlaps = {
+  radius_m: number;
+  edges: { outlet_id: number; neighbour_id: number; distance_m: number }[];
+  neighbour_counts: Record<string, number>;
+};
 
 export default function OutletMap() {
-  const [intersectingIds, setIntersectingIds] = useState<Set<number>>(
-    new Set()
-  );
   const [chatbotResults, setChatbotResults] = useState<Outlet[] | null>(null);
   const [chatbotLoading, setChatbotLoading] = useState(false);
   const [chatbotError, setChatbotError] = useState<string | null>(null);
@@ -70,30 +61,30 @@ export default function OutletMap() {
 
   const currentOutlets: Outlet[] = chatbotResults ?? outlets;
 
-  useEffect(() => {
-    if (!currentOutlets.length) {
-      setIntersectingIds(new Set());
-      return;
-    }
+  // Overlapping pairs are precomputed by the backend whenever outlets change
+  const { data: overlaps } = useQuery<OutletOverlaps>({
+    queryKey: ["outlet-overlaps", RADIUS_METERS],
+    queryFn: async () => {
+      const res = await fetch(
+        `${import.meta.env.VITE_API_URL}/outlets/overlaps?radius=${RADIUS_METERS}`
+      );
+      if (!res.ok) throw new Error("Failed to fetch outlet overlaps");
+      return res.json();
+    },
+  });
+
+  const intersectingIds = useMemo(() => {
     const intersecting = new Set<number>();
-    for (let i = 0; i < currentOutlets.length; i++) {
-      for (let j = i + 1; j < currentOutlets.length; j++) {
-        const a = currentOutlets[i],
-          b = currentOutlets[j];
-        if (
-          a.latitude &&
-          a.longitude &&
-          b.latitude &&
-          b.longitude &&
-          haversineDistance(a, b) <= RADIUS_METERS * 2
-        ) {
-          intersecting.add(a.id);
-          intersecting.add(b.id);
-        }
+    if (!overlaps || !currentOutlets.length) return intersecting;
+    const visibleIds = new Set(currentOutlets.map((outlet) => outlet.id));
+    for (const edge of overlaps.edges) {
+      if (visibleIds.has(edge.outlet_id) && visibleIds.has(edge.neighbour_id)) {
+        intersecting.add(edge.outlet_id);
+        intersecting.add(edge.neighbour_id);
       }
     }
-    setIntersectingIds(intersecting);
-  }, [currentOutlets]);
+    return intersecting;
+  }, [overlaps, currentOutlets]);
 
   const center: LatLngExpression = currentOutlets.length
     ? [currentOutlets[0].latitude, currentOutlets[0].longitude]